@@ -8,6 +8,7 @@ import os
 from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile, Form
 
 from core.dependencies import require_role
+from core.file_utils import get_upload_dir
 from db.db_base import get_cursor
 
 router = APIRouter()
@@ -237,11 +238,7 @@ def verify_penerima_pupuk(
         # Handle file upload
         file_path = None
         if bukti_foto and bukti_foto.filename:
-            if os.getenv("VERCEL"):
-                upload_dir = "/tmp/uploads"
-            else:
-                upload_dir = "tmp/uploads"
-            os.makedirs(upload_dir, exist_ok=True)
+            upload_dir = get_upload_dir()
             
             # Generate unique filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -6,7 +6,7 @@ from pathlib import Path
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Query
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List
 
 from core.dependencies import require_role
@@ -167,17 +167,19 @@ def ajukan_permohonan(
 @router.get("/petani/pengajuan_pupuk/riwayat")
 def riwayat_permohonan(user=Depends(require_role("petani")), db: Session = Depends(get_db)) -> list:
     """Get application history"""
-    permohonan_list = db.query(PermohonanPupuk).filter(
+    permohonan_list = db.query(PermohonanPupuk).options(
+        joinedload(PermohonanPupuk.pupuk)
+    ).filter(
         PermohonanPupuk.petani_id == user["id"]
     ).order_by(PermohonanPupuk.created_at.desc()).limit(5).all()
     
     result = []
     for p in permohonan_list:
-        pupuk = db.query(StokPupuk).filter(StokPupuk.id == p.pupuk_id).first()
+        # p.pupuk is joined-loaded with the permohonan, no query per row
         result.append({
             "id": p.id,
             "pupuk_id": p.pupuk_id,
-            "nama_pupuk": pupuk.nama_pupuk if pupuk else None,
+            "nama_pupuk": p.pupuk.nama_pupuk if p.pupuk else None,
             "jumlah_diminta": p.jumlah_diminta,
             "jumlah_disetujui": p.jumlah_disetujui,
             "status": p.status,
@@ -195,7 +197,9 @@ def konfirmasi_terima(
     """Confirm fertilizer delivery receipt"""
     try:
         # Get application
-        permohonan = db.query(PermohonanPupuk).filter(
+        permohonan = db.query(PermohonanPupuk).options(
+            joinedload(PermohonanPupuk.pupuk)
+        ).filter(
             PermohonanPupuk.id == permohonan_id,
             PermohonanPupuk.petani_id == user["id"]
         ).first()
@@ -212,8 +216,8 @@ def konfirmasi_terima(
         # Update status to 'selesai'
         permohonan.status = 'selesai'
         
-        # Decrement stok
-        pupuk = db.query(StokPupuk).filter(StokPupuk.id == permohonan.pupuk_id).first()
+        # Decrement stok (pupuk was joined-loaded with the permohonan)
+        pupuk = permohonan.pupuk
         if pupuk:
             pupuk.jumlah_stok = max(0, pupuk.jumlah_stok - (permohonan.jumlah_disetujui or 0))
         
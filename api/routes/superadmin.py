@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from core.dependencies import require_role
 from core.security import hash_password
 from db.db_base import get_cursor
@@ -76,7 +76,9 @@ def metrics(user=Depends(require_role("super_admin"))):
 
 @router.get("/users", response_model=list[UserListResponse])
 def list_users(
+    response: Response,
     role: Optional[str] = Query(None),
+    cursor: Optional[int] = Query(None, ge=1),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     user=Depends(require_role("super_admin")),
@@ -84,14 +86,24 @@ def list_users(
     """
     List all users with optional role filtering.
     Roles: petani, admin, distributor, super_admin
+
+    Pass the last seen user_id as `cursor` to fetch the next page by key
+    (`u.id < cursor`) instead of skipping rows with OFFSET. When a full page
+    is returned, the cursor for the following page is sent in the
+    `X-Next-Cursor` header. `page` is kept for existing clients and ignored
+    when `cursor` is given.
     """
-    offset = (page - 1) * page_size
+    offset = 0 if cursor is not None else (page - 1) * page_size
     filters = []
     params = []
     
     if role:
         filters.append("u.role = %s")
         params.append(role)
+
+    if cursor is not None:
+        filters.append("u.id < %s")
+        params.append(cursor)
     
     where = f"WHERE {' AND '.join(filters)}" if filters else ""
     
@@ -122,6 +134,8 @@ def list_users(
     with get_cursor() as cur:
         cur.execute(sql, tuple(params))
         rows = cur.fetchall()
+        if len(rows) == page_size:
+            response.headers["X-Next-Cursor"] = str(rows[-1]["user_id"])
         return [dict(row) for row in rows]
 
 @router.get("/users/{user_id}", response_model=dict)
@@ -15,6 +15,16 @@ class Settings:
     
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+
+    # bcrypt cost factor; keep the default in production, lower only for tests
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    if not 4 <= BCRYPT_ROUNDS <= 31:
+        raise ValueError(f"Invalid BCRYPT_ROUNDS: {BCRYPT_ROUNDS} (must be 4-31)")
+    
+    # Decoded JWTs kept in memory (per process); 0 turns the cache off
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+    if TOKEN_CACHE_SIZE < 0:
+        raise ValueError(f"Invalid TOKEN_CACHE_SIZE: {TOKEN_CACHE_SIZE} (must be >= 0)")
     
     # Database configuration validation
     ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
@@ -1,10 +1,11 @@
+from functools import lru_cache
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError
 from sqlalchemy.orm import Session
 import logging
 
-from core.config import settings
+from core.security import decode_access_token
 from db.db_base import get_db
 from db.models import User
 
@@ -19,9 +20,7 @@ def get_current_user(
     db: Session = Depends(get_db),
 ) -> User:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_access_token(token)
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -41,11 +40,19 @@ def get_current_user(
 def require_role(*roles, optional=False):
     """
     Dependency to require specific roles.
+    Every route guarded by the same roles shares one checker, however the call
+    is spelled (so app.dependency_overrides[require_role("admin")] covers all of them).
 
     Args:
         roles: Allowed role names
         optional: If True, returns None instead of raising 401 when not authenticated
     """
+    return _require_role(tuple(roles), bool(optional))
+
+
+@lru_cache(maxsize=None)
+def _require_role(roles: tuple[str, ...], optional: bool):
+    """Build the checker for require_role, once per (roles, optional) pair."""
 
     def checker(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
         if not token:
@@ -54,9 +61,7 @@ def require_role(*roles, optional=False):
             raise HTTPException(status_code=401, detail="Not authenticated")
 
         try:
-            payload = jwt.decode(
-                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-            )
+            payload = decode_access_token(token)
             user_id = payload.get("sub")
             if not user_id:
                 if optional:
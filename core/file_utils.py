@@ -1,6 +1,7 @@
 import os
 import uuid
 import logging
+from functools import lru_cache
 from pathlib import Path
 from fastapi import HTTPException, UploadFile
 
@@ -13,6 +14,20 @@ ALLOWED_EXTENSIONS = {
     "pengajuan_pupuk": {".pdf", ".jpg", ".jpeg", ".png", ".doc", ".docx"},
 }
 
+# Use /tmp/uploads for Vercel, else relative tmp/uploads
+UPLOAD_ROOT = Path("/tmp/uploads") if os.getenv("VERCEL") else Path("tmp/uploads")
+
+
+@lru_cache(maxsize=None)
+def get_upload_dir(subdir: str = "") -> Path:
+    """
+    Return the uploads directory (or a subdirectory of it), creating it on first use.
+    Cached, so each process touches the filesystem once per directory.
+    """
+    path = UPLOAD_ROOT / subdir if subdir else UPLOAD_ROOT
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
 
 def save_upload_file(file: UploadFile, subdir: str) -> str:
     """
@@ -42,12 +57,8 @@ def save_upload_file(file: UploadFile, subdir: str) -> str:
         )
 
     # Create directory
-    if os.getenv("VERCEL"):
-        uploads_root = Path("/tmp/uploads") / subdir
-    else:
-        uploads_root = Path("tmp/uploads") / subdir
     try:
-        uploads_root.mkdir(parents=True, exist_ok=True)
+        uploads_root = get_upload_dir(subdir)
     except Exception as e:
         logger.error(f"Error creating upload directory: {str(e)}")
         raise HTTPException(status_code=500, detail="Gagal membuat direktori upload")
@@ -1,13 +1,17 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
+from time import time as _now
 from jose import jwt
+from jose.exceptions import ExpiredSignatureError
 import bcrypt
 from core.config import settings
 
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: int | None = None) -> str:
     # Bcrypt has a 72-byte limit, encode to bytes
+    # Lower rounds are only meant for seed/test data, never for real accounts
     password_bytes = password.encode("utf-8")
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds or settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode("utf-8")
 
@@ -24,3 +28,18 @@ def create_access_token(data: dict):
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+@lru_cache(maxsize=settings.TOKEN_CACHE_SIZE)
+def _decode_token(token: str) -> dict:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+def decode_access_token(token: str) -> dict:
+    # Signature is verified once per token; invalid tokens raise and are never cached.
+    # A cached payload can outlive its "exp", so expiry is re-checked on every call
+    payload = _decode_token(token)
+    exp = payload.get("exp")
+    if exp is not None and exp < _now():
+        raise ExpiredSignatureError("Signature has expired.")
+    return payload
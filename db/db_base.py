@@ -1,5 +1,6 @@
 ﻿import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
 from sqlalchemy import create_engine, event, text
@@ -46,16 +47,43 @@ else:
 
 logger.info(f"Database environment: {ENVIRONMENT}")
 
+# Connection pool tuning (override via environment)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_USE_LIFO = (os.getenv("DB_POOL_USE_LIFO") or "1").strip().lower() in {"1", "true", "yes", "y", "on"}
+# Open DB_POOL_SIZE connections at startup; off by default (pointless on serverless cold starts)
+DB_POOL_WARMUP = (os.getenv("DB_POOL_WARMUP") or "0").strip().lower() in {"1", "true", "yes", "y", "on"}
+
+
+def _pool_options(url: str) -> dict:
+    """
+    Build QueuePool options for server databases.
+    SQLite keeps SQLAlchemy's default pool for its dialect.
+    """
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": 30,
+        "pool_use_lifo": DB_POOL_USE_LIFO,  # Reuse the most recently returned connection
+    }
+
+
 # Create engine with connection pooling
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,  # Test connections before using
-    pool_recycle=3600,  # Recycle connections after 1 hour
+    pool_recycle=1800,  # Recycle connections after 30 minutes
     echo=ENVIRONMENT == "development",  # Log SQL in development
+    **_pool_options(DATABASE_URL),
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engines disposed by close_all_connections (add read replicas here)
+_engines = [engine]
+
 _tables_initialized = False
 
 
@@ -70,21 +98,59 @@ def init_connection_pool():
     """
     Create tables if they don't exist.
     Initialize the database schema.
+    The engine's pool is configured at import time (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_USE_LIFO).
     """
     try:
         Base.metadata.create_all(bind=engine)
         logger.info("Database tables initialized successfully")
+        logger.info(
+            "Connection pool: size=%s max_overflow=%s lifo=%s",
+            DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_USE_LIFO,
+        )
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
         raise
 
 
+def warm_connection_pool(size: int = DB_POOL_SIZE) -> int:
+    """
+    Open `size` pooled connections concurrently and run SELECT 1 on each,
+    so the first requests after startup don't pay connection setup.
+    Returns the number of connections warmed (0 for SQLite or a pool size of 0).
+    """
+    if engine.dialect.name == "sqlite" or size <= 0:
+        return 0
+
+    def _open():
+        conn = engine.connect()
+        try:
+            conn.execute(text("SELECT 1"))
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    # Hold every connection until all are open so the pool creates `size` distinct ones
+    with ThreadPoolExecutor(max_workers=size) as executor:
+        futures = [executor.submit(_open) for _ in range(size)]
+    connections = [f.result() for f in futures if f.exception() is None]
+    for conn in connections:
+        conn.close()
+
+    failed = size - len(connections)
+    if failed:
+        logger.warning(f"Failed to warm {failed} of {size} pooled connections")
+    return len(connections)
+
+
 def close_all_connections():
     """
-    Dispose of the engine and close all connections.
+    Dispose of every registered engine and close all connections.
+    Engines are disposed concurrently so shutdown waits on the slowest one only.
     """
     try:
-        engine.dispose()
+        with ThreadPoolExecutor(max_workers=len(_engines)) as executor:
+            list(executor.map(lambda e: e.dispose(), _engines))
         logger.info("Database connections closed")
     except Exception as e:
         logger.error(f"Error closing database connections: {str(e)}")
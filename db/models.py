@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, ForeignKey, CheckConstraint, Index
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
 
@@ -98,6 +98,8 @@ class RiwayatStockPupuk(Base):
 
     __table_args__ = (
         CheckConstraint("tipe IN ('tambah','kurangi')"),
+        # Per-pupuk history in time order is read from the index, no sort
+        Index("ix_riwayat_stock_pupuk_pupuk_id_created_at", "pupuk_id", "created_at"),
     )
 
     pupuk = relationship("StokPupuk", back_populates="riwayat_stock")
@@ -131,7 +133,7 @@ class JadwalDistribusi(Base):
     __tablename__ = "jadwal_distribusi_pupuk"
 
     id = Column(Integer, primary_key=True, index=True)
-    permohonan_id = Column(Integer, ForeignKey("pengajuan_pupuk.id", ondelete="CASCADE"), nullable=False)
+    permohonan_id = Column(Integer, ForeignKey("pengajuan_pupuk.id", ondelete="CASCADE"), nullable=False, index=True)
     tanggal_pengiriman = Column(Date, nullable=False)
     lokasi = Column(Text, nullable=False)
     status = Column(String, nullable=False)
@@ -147,7 +149,7 @@ class HasilTani(Base):
     __tablename__ = "hasil_tani"
 
     id = Column(Integer, primary_key=True, index=True)
-    petani_id = Column(Integer, ForeignKey("profile_petani.user_id", ondelete="RESTRICT"), nullable=False)
+    petani_id = Column(Integer, ForeignKey("profile_petani.user_id", ondelete="RESTRICT"), nullable=False, index=True)
     jenis_tanaman = Column(Text, nullable=False)
     jumlah_hasil = Column(Integer, nullable=False)
     satuan = Column(Text, nullable=False)
@@ -187,7 +189,7 @@ class VerifikasiPenerimaPupuk(Base):
     __tablename__ = "verifikasi_penerima_pupuk"
 
     id = Column(Integer, primary_key=True, index=True)
-    permohonan_id = Column(Integer, ForeignKey("pengajuan_pupuk.id", ondelete="CASCADE"), nullable=False)
+    permohonan_id = Column(Integer, ForeignKey("pengajuan_pupuk.id", ondelete="CASCADE"), nullable=False, index=True)
     distributor_id = Column(Integer, ForeignKey("users.id", ondelete="RESTRICT"), nullable=False)
     bukti_foto_url = Column(Text)
     catatan = Column(Text)
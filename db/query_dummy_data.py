@@ -5,36 +5,54 @@ Query and print dummy data for petani, stok pupuk, pengajuan pupuk, and jadwal d
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from sqlalchemy import select
 from db.db_base import SessionLocal
-from db.models import ProfilePetani, StokPupuk, PermohonanPupuk, JadwalDistribusi, HasilTani
+from db.models import ProfilePetani, StokPupuk, PermohonanPupuk, JadwalDistribusi, JadwalDistribusiEvent, HasilTani
 
 session = SessionLocal()
 
-print("\n--- Petani ---")
-for petani in session.query(ProfilePetani).all():
-    print(f"ID: {petani.user_id}, Nama: {petani.nama_lengkap}, NIK: {petani.nik}, Alamat: {petani.alamat}, No HP: {petani.no_hp}")
-
-print("\n--- Stok Pupuk ---")
-for stok in session.query(StokPupuk).all():
-    print(f"ID: {stok.id}, Nama: {stok.nama_pupuk}, Jumlah: {stok.jumlah_stok} {stok.satuan}")
-
-print("\n--- Pengajuan Pupuk ---")
-for permohonan in session.query(PermohonanPupuk).all():
-    event_str = f", EventID: {permohonan.jadwal_event_id}" if permohonan.jadwal_event_id else ""
-    print(f"ID: {permohonan.id}, Petani ID: {permohonan.petani_id}, Pupuk ID: {permohonan.pupuk_id}, Diminta: {permohonan.jumlah_diminta}, Disetujui: {permohonan.jumlah_disetujui}, Status: {permohonan.status}{event_str}")
-
-print("\n--- Jadwal Distribusi Event ---")
-# Import JadwalDistribusiEvent locally or at top if added
-from db.models import JadwalDistribusiEvent
-for event in session.query(JadwalDistribusiEvent).all():
-    print(f"ID: {event.id}, Acara: {event.nama_acara}, Lokasi: {event.lokasi}, Tanggal: {event.tanggal}")
-
-print("\n--- Jadwal Distribusi Pupuk ---")
-for jadwal in session.query(JadwalDistribusi).all():
-    print(f"ID: {jadwal.id}, Permohonan ID: {jadwal.permohonan_id}, Tanggal: {jadwal.tanggal_pengiriman}, Lokasi: {jadwal.lokasi}, Status: {jadwal.status}")
-
-print("\n--- Hasil Tani ---")
-for hasil in session.query(HasilTani).all():
-    print(f"ID: {hasil.id}, Petani ID: {hasil.petani_id}, Jenis Tanaman: {hasil.jenis_tanaman}, Jumlah: {hasil.jumlah_hasil} {hasil.satuan}, Tanggal Panen: {hasil.tanggal_panen}")
+# Select only the printed columns and write everything in one call
+lines = ["\n--- Petani ---"]
+for user_id, nama, nik, alamat, no_hp in session.execute(
+    select(ProfilePetani.user_id, ProfilePetani.nama_lengkap, ProfilePetani.nik, ProfilePetani.alamat, ProfilePetani.no_hp)
+):
+    lines.append(f"ID: {user_id}, Nama: {nama}, NIK: {nik}, Alamat: {alamat}, No HP: {no_hp}")
+
+lines.append("\n--- Stok Pupuk ---")
+for stok_id, nama, jumlah, satuan in session.execute(
+    select(StokPupuk.id, StokPupuk.nama_pupuk, StokPupuk.jumlah_stok, StokPupuk.satuan)
+):
+    lines.append(f"ID: {stok_id}, Nama: {nama}, Jumlah: {jumlah} {satuan}")
+
+lines.append("\n--- Pengajuan Pupuk ---")
+for req_id, petani_id, pupuk_id, diminta, disetujui, status, event_id in session.execute(
+    select(
+        PermohonanPupuk.id, PermohonanPupuk.petani_id, PermohonanPupuk.pupuk_id,
+        PermohonanPupuk.jumlah_diminta, PermohonanPupuk.jumlah_disetujui,
+        PermohonanPupuk.status, PermohonanPupuk.jadwal_event_id,
+    )
+):
+    event_str = f", EventID: {event_id}" if event_id else ""
+    lines.append(f"ID: {req_id}, Petani ID: {petani_id}, Pupuk ID: {pupuk_id}, Diminta: {diminta}, Disetujui: {disetujui}, Status: {status}{event_str}")
+
+lines.append("\n--- Jadwal Distribusi Event ---")
+for event_id, nama_acara, lokasi, tanggal in session.execute(
+    select(JadwalDistribusiEvent.id, JadwalDistribusiEvent.nama_acara, JadwalDistribusiEvent.lokasi, JadwalDistribusiEvent.tanggal)
+):
+    lines.append(f"ID: {event_id}, Acara: {nama_acara}, Lokasi: {lokasi}, Tanggal: {tanggal}")
+
+lines.append("\n--- Jadwal Distribusi Pupuk ---")
+for jadwal_id, permohonan_id, tanggal, lokasi, status in session.execute(
+    select(JadwalDistribusi.id, JadwalDistribusi.permohonan_id, JadwalDistribusi.tanggal_pengiriman, JadwalDistribusi.lokasi, JadwalDistribusi.status)
+):
+    lines.append(f"ID: {jadwal_id}, Permohonan ID: {permohonan_id}, Tanggal: {tanggal}, Lokasi: {lokasi}, Status: {status}")
+
+lines.append("\n--- Hasil Tani ---")
+for hasil_id, petani_id, jenis, jumlah, satuan, tanggal_panen in session.execute(
+    select(HasilTani.id, HasilTani.petani_id, HasilTani.jenis_tanaman, HasilTani.jumlah_hasil, HasilTani.satuan, HasilTani.tanggal_panen)
+):
+    lines.append(f"ID: {hasil_id}, Petani ID: {petani_id}, Jenis Tanaman: {jenis}, Jumlah: {jumlah} {satuan}, Tanggal Panen: {tanggal_panen}")
+
+sys.stdout.write("\n".join(lines) + "\n")
 
 session.close()
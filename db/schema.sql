@@ -123,3 +123,9 @@ CREATE TABLE IF NOT EXISTS verifikasi_penerima_pupuk (
   created_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
+
+-- Indexes (names match the ORM models)
+CREATE INDEX IF NOT EXISTS ix_riwayat_stock_pupuk_pupuk_id_created_at ON riwayat_stock_pupuk (pupuk_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_jadwal_distribusi_pupuk_permohonan_id ON jadwal_distribusi_pupuk (permohonan_id);
+CREATE INDEX IF NOT EXISTS ix_hasil_tani_petani_id ON hasil_tani (petani_id);
+CREATE INDEX IF NOT EXISTS ix_verifikasi_penerima_pupuk_permohonan_id ON verifikasi_penerima_pupuk (permohonan_id);
@@ -8,7 +8,7 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from db.db_base import SessionLocal, engine, Base
+from db.db_base import SessionLocal, ensure_tables
 from db.models import (
     User, ProfilePetani, ProfileDistributor, ProfileAdmin, ProfileSuperadmin,
     StokPupuk, PermohonanPupuk, JadwalDistribusi, HasilTani, 
@@ -16,13 +16,30 @@ from db.models import (
     VerifikasiPenerimaPupuk
 )
 from core.security import hash_password
-from datetime import datetime, timedelta, date
+from sqlalchemy import insert
+from datetime import datetime, timedelta
+
+# Seed-only password hash at the minimum bcrypt cost (4 rounds); every dummy
+# account shares it. Production accounts are hashed at the default cost.
+SEED_PASSWORD_HASH = hash_password("password123", rounds=4)
+
+# Rows that are never read back are written with one executemany per table;
+# Core inserts skip ORM bookkeeping and batch into multi-row VALUES.
+INSERT_EVENT_ITEMS = insert(JadwalDistribusiItem)
+INSERT_JADWAL_DISTRIBUSI = insert(JadwalDistribusi)
+INSERT_RIWAYAT_STOCK = insert(RiwayatStockPupuk)
+INSERT_HASIL_TANI = insert(HasilTani)
+INSERT_VERIFIKASI = insert(VerifikasiPenerimaPupuk)
 
 def seed_all_data():
     """Seed all dummy data to the database"""
     
-    # Create tables first
-    Base.metadata.create_all(bind=engine)
+    # One timestamp for the whole batch
+    now = datetime.now()
+    today = now.date()
+
+    # Create tables first (no-op once initialized in this process)
+    ensure_tables()
 
     # Create uploads directory if it doesn't exist
     upload_dir = "uploads"
@@ -64,37 +81,24 @@ def seed_all_data():
         # ========== USERS & PROFILES ==========
         print("\nSeeding users and profiles...")
         
-        # Petani users
+        # All seed users share SEED_PASSWORD_HASH; insert every user in a
+        # single flush (one multi-row INSERT ... RETURNING id).
+        password_hash = SEED_PASSWORD_HASH
+
         petani_users = [
-            User(username="petani001", password_hash=hash_password("password123"), role="petani"),
-            User(username="petani002", password_hash=hash_password("password123"), role="petani"),
-            User(username="petani003", password_hash=hash_password("password123"), role="petani"),
-            User(username="petani004", password_hash=hash_password("password123"), role="petani"),
-            User(username="petani005", password_hash=hash_password("password123"), role="petani"),
+            User(username=f"petani{i:03d}", password_hash=password_hash, role="petani")
+            for i in range(1, 6)
         ]
-        session.add_all(petani_users)
-        session.flush()
-        
-        # Distributor users
         distributor_users = [
-            User(username="distributor001", password_hash=hash_password("password123"), role="distributor"),
-            User(username="distributor002", password_hash=hash_password("password123"), role="distributor"),
+            User(username=f"distributor{i:03d}", password_hash=password_hash, role="distributor")
+            for i in range(1, 3)
         ]
-        session.add_all(distributor_users)
-        session.flush()
-        
-        # Admin user
-        admin_user = User(username="admin001", password_hash=hash_password("password123"), role="admin")
-        session.add(admin_user)
-        session.flush()
-        
-        # Superadmin user
-        superadmin_user = User(username="superadmin001", password_hash=hash_password("password123"), role="super_admin")
-        session.add(superadmin_user)
+        admin_user = User(username="admin001", password_hash=password_hash, role="admin")
+        superadmin_user = User(username="superadmin001", password_hash=password_hash, role="super_admin")
+
+        session.add_all([*petani_users, *distributor_users, admin_user, superadmin_user])
         session.flush()
         
-        session.commit()
-        
         # Create petani profiles
         petani_profiles = [
             ProfilePetani(
@@ -149,7 +153,6 @@ def seed_all_data():
             ),
         ]
         session.add_all(petani_profiles)
-        session.flush()
         
         # Create distributor profiles
         distributor_profiles = [
@@ -171,7 +174,6 @@ def seed_all_data():
             ),
         ]
         session.add_all(distributor_profiles)
-        session.flush()
         
         # Create admin profile
         admin_profile = ProfileAdmin(
@@ -181,7 +183,6 @@ def seed_all_data():
             no_hp="083234567890"
         )
         session.add(admin_profile)
-        session.flush()
         
         # Create superadmin profile
         superadmin_profile = ProfileSuperadmin(
@@ -215,13 +216,13 @@ def seed_all_data():
         events = [
             JadwalDistribusiEvent(
                 nama_acara="Pembagian Pupuk Musim Tanam Musim Hujan",
-                tanggal=date.today() + timedelta(days=10),
+                tanggal=today + timedelta(days=10),
                 lokasi="Lapangan Desa Suka Maju",
                 status="dijadwalkan"
             ),
             JadwalDistribusiEvent(
                 nama_acara="Pembagian Pupuk Berkualitas Tinggi untuk Petani",
-                tanggal=date.today() + timedelta(days=20),
+                tanggal=today + timedelta(days=20),
                 lokasi="Balai Desa Makmur Jaya"
             ),
         ]
@@ -230,32 +231,32 @@ def seed_all_data():
         
         # Event items
         event_items = [
-            JadwalDistribusiItem(
+            dict(
                 event_id=events[0].id,
                 pupuk_id=fertilizers[0].id,
                 jumlah=1000,
                 satuan="kg"
             ),
-            JadwalDistribusiItem(
+            dict(
                 event_id=events[0].id,
                 pupuk_id=fertilizers[1].id,
                 jumlah=500,
                 satuan="kg"
             ),
-            JadwalDistribusiItem(
+            dict(
                 event_id=events[1].id,
                 pupuk_id=fertilizers[3].id,
                 jumlah=800,
                 satuan="kg"
             ),
-            JadwalDistribusiItem(
+            dict(
                 event_id=events[1].id,
                 pupuk_id=fertilizers[4].id,
                 jumlah=600,
                 satuan="kg"
             ),
         ]
-        session.add_all(event_items)
+        session.execute(INSERT_EVENT_ITEMS, event_items)
         session.commit()
         print("[OK] Seeded 2 events with 4 items")
 
@@ -270,7 +271,7 @@ def seed_all_data():
                 jumlah_disetujui=280,
                 status="terverifikasi",
                 alasan="Kebutuhan musim tanam padi",
-                created_at=datetime.now(),
+                created_at=now,
                 jadwal_event_id=events[0].id
             ),
             PermohonanPupuk(
@@ -280,7 +281,7 @@ def seed_all_data():
                 jumlah_disetujui=200,
                 status="dijadwalkan",
                 alasan="Pemupukan lanjutan tanaman jagung",
-                created_at=datetime.now(),
+                created_at=now,
                 jadwal_event_id=events[0].id
             ),
             PermohonanPupuk(
@@ -290,7 +291,7 @@ def seed_all_data():
                 jumlah_disetujui=250,
                 status="dijadwalkan",
                 alasan="Persiapan penanaman musim tanam",
-                created_at=datetime.now(),
+                created_at=now,
                 jadwal_event_id=events[1].id
             ),
             PermohonanPupuk(
@@ -300,7 +301,7 @@ def seed_all_data():
                 jumlah_disetujui=None,
                 status="pending",
                 alasan="Kebutuhan mendesak untuk tanaman sayuran",
-                created_at=datetime.now()
+                created_at=now
             ),
             PermohonanPupuk(
                 petani_id=petani_profiles[4].user_id,
@@ -309,7 +310,7 @@ def seed_all_data():
                 jumlah_disetujui=450,
                 status="dijadwalkan",
                 alasan="Pemupukan organik untuk keberlanjutan",
-                created_at=datetime.now(),
+                created_at=now,
                 jadwal_event_id=events[1].id
             ),
             PermohonanPupuk(
@@ -319,7 +320,7 @@ def seed_all_data():
                 jumlah_disetujui=100,
                 status="selesai",
                 alasan="Pemeliharaan tanaman",
-                created_at=datetime.now() - timedelta(days=7)
+                created_at=now - timedelta(days=7)
             ),
         ]
         session.add_all(permohonan_list)
@@ -330,38 +331,38 @@ def seed_all_data():
         print("\nSeeding distribution schedules...")
         
         jadwal_list = [
-            JadwalDistribusi(
+            dict(
                 permohonan_id=permohonan_list[0].id,
-                tanggal_pengiriman=date.today() + timedelta(days=3),
+                tanggal_pengiriman=today + timedelta(days=3),
                 lokasi="Gudang Desa Suka Maju, RT 01 RW 02",
                 status="dijadwalkan"
             ),
-            JadwalDistribusi(
+            dict(
                 permohonan_id=permohonan_list[1].id,
-                tanggal_pengiriman=date.today() + timedelta(days=5),
+                tanggal_pengiriman=today + timedelta(days=5),
                 lokasi="Gudang Desa Makmur Jaya, RT 03 RW 05",
                 status="dijadwalkan"
             ),
-            JadwalDistribusi(
+            dict(
                 permohonan_id=permohonan_list[2].id,
-                tanggal_pengiriman=date.today() + timedelta(days=2),
+                tanggal_pengiriman=today + timedelta(days=2),
                 lokasi="Gudang Desa Maju Sejahtera, RT 02 RW 03",
                 status="dijadwalkan"
             ),
-            JadwalDistribusi(
+            dict(
                 permohonan_id=permohonan_list[4].id,
-                tanggal_pengiriman=date.today() + timedelta(days=20),
+                tanggal_pengiriman=today + timedelta(days=20),
                 lokasi="Gudang Desa Tani Subur, RT 05 RW 02",
                 status="dijadwalkan"
             ),
-            JadwalDistribusi(
+            dict(
                 permohonan_id=permohonan_list[5].id,
-                tanggal_pengiriman=date.today() - timedelta(days=8),
+                tanggal_pengiriman=today - timedelta(days=8),
                 lokasi="Gudang Desa Suka Maju, RT 01 RW 02",
                 status="selesai"
             ),
         ]
-        session.add_all(jadwal_list)
+        session.execute(INSERT_JADWAL_DISTRIBUSI, jadwal_list)
         session.commit()
         print("[OK] Seeded 5 distribution schedules")
         
@@ -369,44 +370,44 @@ def seed_all_data():
         print("\nSeeding stock history...")
         
         riwayat_stock = [
-            RiwayatStockPupuk(
+            dict(
                 pupuk_id=fertilizers[0].id,
                 tipe="tambah",
                 jumlah=5000,
                 satuan="kg",
                 catatan="Stock awal dari gudang pusat",
                 admin_user_id=admin_user.id,
-                created_at=datetime.now() - timedelta(days=30)
+                created_at=now - timedelta(days=30)
             ),
-            RiwayatStockPupuk(
+            dict(
                 pupuk_id=fertilizers[0].id,
                 tipe="kurangi",
                 jumlah=280,
                 satuan="kg",
                 catatan="Penyerahan untuk Permohonan #1",
                 admin_user_id=admin_user.id,
-                created_at=datetime.now() - timedelta(days=2)
+                created_at=now - timedelta(days=2)
             ),
-            RiwayatStockPupuk(
+            dict(
                 pupuk_id=fertilizers[1].id,
                 tipe="tambah",
                 jumlah=3000,
                 satuan="kg",
                 catatan="Stock awal dari gudang pusat",
                 admin_user_id=admin_user.id,
-                created_at=datetime.now() - timedelta(days=30)
+                created_at=now - timedelta(days=30)
             ),
-            RiwayatStockPupuk(
+            dict(
                 pupuk_id=fertilizers[2].id,
                 tipe="tambah",
                 jumlah=2500,
                 satuan="kg",
                 catatan="Pembelian tambahan dari supplier",
                 admin_user_id=admin_user.id,
-                created_at=datetime.now() - timedelta(days=15)
+                created_at=now - timedelta(days=15)
             ),
         ]
-        session.add_all(riwayat_stock)
+        session.execute(INSERT_RIWAYAT_STOCK, riwayat_stock)
         session.commit()
         print("[OK] Seeded 4 stock history records")
         
@@ -414,56 +415,56 @@ def seed_all_data():
         print("\nSeeding harvest records...")
         
         hasil_tani_list = [
-            HasilTani(
+            dict(
                 petani_id=petani_profiles[0].user_id,
                 jenis_tanaman="Padi",
                 jumlah_hasil=5000,
                 satuan="kg",
-                tanggal_panen=date.today() - timedelta(days=30),
-                created_at=datetime.now() - timedelta(days=30)
+                tanggal_panen=today - timedelta(days=30),
+                created_at=now - timedelta(days=30)
             ),
-            HasilTani(
+            dict(
                 petani_id=petani_profiles[1].user_id,
                 jenis_tanaman="Jagung",
                 jumlah_hasil=3500,
                 satuan="kg",
-                tanggal_panen=date.today() - timedelta(days=25),
-                created_at=datetime.now() - timedelta(days=25)
+                tanggal_panen=today - timedelta(days=25),
+                created_at=now - timedelta(days=25)
             ),
-            HasilTani(
+            dict(
                 petani_id=petani_profiles[2].user_id,
                 jenis_tanaman="Cabai",
                 jumlah_hasil=800,
                 satuan="kg",
-                tanggal_panen=date.today() - timedelta(days=20),
-                created_at=datetime.now() - timedelta(days=20)
+                tanggal_panen=today - timedelta(days=20),
+                created_at=now - timedelta(days=20)
             ),
-            HasilTani(
+            dict(
                 petani_id=petani_profiles[0].user_id,
                 jenis_tanaman="Bawang Merah",
                 jumlah_hasil=1200,
                 satuan="kg",
-                tanggal_panen=date.today() - timedelta(days=15),
-                created_at=datetime.now() - timedelta(days=15)
+                tanggal_panen=today - timedelta(days=15),
+                created_at=now - timedelta(days=15)
             ),
-            HasilTani(
+            dict(
                 petani_id=petani_profiles[3].user_id,
                 jenis_tanaman="Tomat",
                 jumlah_hasil=600,
                 satuan="kg",
-                tanggal_panen=date.today() - timedelta(days=10),
-                created_at=datetime.now() - timedelta(days=10)
+                tanggal_panen=today - timedelta(days=10),
+                created_at=now - timedelta(days=10)
             ),
-            HasilTani(
+            dict(
                 petani_id=petani_profiles[4].user_id,
                 jenis_tanaman="Kentang",
                 jumlah_hasil=2000,
                 satuan="kg",
-                tanggal_panen=date.today() - timedelta(days=5),
-                created_at=datetime.now() - timedelta(days=5)
+                tanggal_panen=today - timedelta(days=5),
+                created_at=now - timedelta(days=5)
             ),
         ]
-        session.add_all(hasil_tani_list)
+        session.execute(INSERT_HASIL_TANI, hasil_tani_list)
         session.commit()
         print("[OK] Seeded 6 harvest records")
         
@@ -473,15 +474,15 @@ def seed_all_data():
         print("\nSeeding recipient verification records...")
         
         verifikasi_list = [
-            VerifikasiPenerimaPupuk(
+            dict(
                 permohonan_id=permohonan_list[5].id,
                 distributor_id=distributor_users[0].id,
                 bukti_foto_url="uploads/bukti_pengiriman1.jpg",
                 catatan="Pupuk diterima dalam kondisi baik oleh petani",
-                tanggal_verifikasi=datetime.now() - timedelta(days=7)
+                tanggal_verifikasi=now - timedelta(days=7)
             )
         ]
-        session.add_all(verifikasi_list)
+        session.execute(INSERT_VERIFIKASI, verifikasi_list)
         session.commit()
         print("[OK] Seeded 1 verification records")
         
@@ -2,45 +2,60 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from sqlalchemy import select, text
+
 from db.db_base import SessionLocal
 from db.models import (
-    User, ProfilePetani, ProfileDistributor, ProfileAdmin, ProfileSuperadmin,
-    StokPupuk, PermohonanPupuk, JadwalDistribusiEvent
+    User, StokPupuk, PermohonanPupuk, JadwalDistribusiEvent
 )
 
 def verify():
     db = SessionLocal()
     try:
-        print("=== USERS ===")
-        users = db.query(User).all()
-        for user in users:
-            print(f"ID: {user.id}, Username: {user.username}, Role: {user.role}")
-        print(f"Total Users: {len(users)}\n")
+        # Select only the printed columns and write each section in one call
+        lines = ["=== USERS ==="]
+        users = db.execute(select(User.id, User.username, User.role)).all()
+        lines += [f"ID: {user_id}, Username: {username}, Role: {role}" for user_id, username, role in users]
+        lines.append(f"Total Users: {len(users)}\n")
+        sys.stdout.write("\n".join(lines) + "\n")
 
+        # All four profile counts in a single round-trip
+        counts = db.execute(text("""
+            SELECT
+                (SELECT COUNT(*) FROM profile_petani) AS petani,
+                (SELECT COUNT(*) FROM profile_distributor) AS distributor,
+                (SELECT COUNT(*) FROM profile_admin) AS admin,
+                (SELECT COUNT(*) FROM profile_superadmin) AS superadmin
+        """)).one()
         print("=== PROFILES ===")
-        print(f"Petani: {db.query(ProfilePetani).count()}")
-        print(f"Distributor: {db.query(ProfileDistributor).count()}")
-        print(f"Admin: {db.query(ProfileAdmin).count()}")
-        print(f"Superadmin: {db.query(ProfileSuperadmin).count()}\n")
-
-        print("=== FERTILIZERS ===")
-        pupuks = db.query(StokPupuk).all()
-        for p in pupuks:
-            print(f"- {p.nama_pupuk}: {p.jumlah_stok} {p.satuan}")
-        print(f"Total Types: {len(pupuks)}\n")
-
-        print("=== DISTRIBUTION EVENTS ===")
-        events = db.query(JadwalDistribusiEvent).all()
-        for e in events:
-            print(f"ID: {e.id}, Acara: {e.nama_acara}, Lokasi: {e.lokasi}")
-        print(f"Total Events: {len(events)}\n")
-
-        print("=== FERTILIZER REQUESTS ===")
-        requests = db.query(PermohonanPupuk).all()
-        for r in requests:
-            event_info = f", Jadwal Event ID: {r.jadwal_event_id}" if r.jadwal_event_id else ""
-            print(f"ID: {r.id}, Petani ID: {r.petani_id}, Status: {r.status}{event_info}")
-        print(f"Total Requests: {len(requests)}\n")
+        print(f"Petani: {counts.petani}")
+        print(f"Distributor: {counts.distributor}")
+        print(f"Admin: {counts.admin}")
+        print(f"Superadmin: {counts.superadmin}\n")
+
+        lines = ["=== FERTILIZERS ==="]
+        pupuks = db.execute(select(StokPupuk.nama_pupuk, StokPupuk.jumlah_stok, StokPupuk.satuan)).all()
+        lines += [f"- {nama}: {jumlah} {satuan}" for nama, jumlah, satuan in pupuks]
+        lines.append(f"Total Types: {len(pupuks)}\n")
+        sys.stdout.write("\n".join(lines) + "\n")
+
+        lines = ["=== DISTRIBUTION EVENTS ==="]
+        events = db.execute(
+            select(JadwalDistribusiEvent.id, JadwalDistribusiEvent.nama_acara, JadwalDistribusiEvent.lokasi)
+        ).all()
+        lines += [f"ID: {event_id}, Acara: {nama_acara}, Lokasi: {lokasi}" for event_id, nama_acara, lokasi in events]
+        lines.append(f"Total Events: {len(events)}\n")
+        sys.stdout.write("\n".join(lines) + "\n")
+
+        lines = ["=== FERTILIZER REQUESTS ==="]
+        requests = db.execute(
+            select(PermohonanPupuk.id, PermohonanPupuk.petani_id, PermohonanPupuk.status, PermohonanPupuk.jadwal_event_id)
+        ).all()
+        for req_id, petani_id, status, jadwal_event_id in requests:
+            event_info = f", Jadwal Event ID: {jadwal_event_id}" if jadwal_event_id else ""
+            lines.append(f"ID: {req_id}, Petani ID: {petani_id}, Status: {status}{event_info}")
+        lines.append(f"Total Requests: {len(requests)}\n")
+        sys.stdout.write("\n".join(lines) + "\n")
 
     except Exception as e:
         print(f"Verification failed: {e}")
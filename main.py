@@ -1,13 +1,14 @@
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from pathlib import Path
 
 from api.router import api_router
-from db.db_base import close_all_connections, init_connection_pool
+from core.file_utils import UPLOAD_ROOT
+from db.db_base import DB_POOL_WARMUP, close_all_connections, init_connection_pool, warm_connection_pool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +19,11 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     logger.info("Initializing database connection pool...")
     init_connection_pool()
+    if DB_POOL_WARMUP:
+        # Opening connections blocks, so keep it off the event loop
+        warmed = await asyncio.to_thread(warm_connection_pool)
+        if warmed:
+            logger.info("Warmed %s pooled database connections", warmed)
     logger.info("Backend API Services for Sistem Distribusi Pupuk Gratis is running")
     yield
     logger.info("Closing database connections...")
@@ -47,6 +53,8 @@ else:
     default_origins = "http://localhost:5173"
 
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", default_origins).split(",")
+# How long browsers may cache a preflight response (seconds)
+CORS_MAX_AGE = int(os.getenv("CORS_MAX_AGE", "86400"))
 
 if os.getenv("ENVIRONMENT") == "production":
     # In production, MUST specify allowed origins explicitly
@@ -58,20 +66,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
     allow_headers=["Content-Type", "Authorization"],
+    expose_headers=["X-Next-Cursor"],
+    max_age=CORS_MAX_AGE,  # Preflights are answered by the middleware itself
 )
 
 app.include_router(api_router)
 
-# Serve uploaded files
-# Use /tmp/uploads for Vercel, else relative tmp/uploads
-if os.getenv("VERCEL"):
-    UPLOAD_DIR = Path("/tmp/uploads")
-else:
-    UPLOAD_DIR = Path("tmp/uploads")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-# Mount the uploads directory
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+class UploadFiles(StaticFiles):
+    """StaticFiles that answers 404 until the first upload creates the root."""
+
+    async def check_config(self) -> None:
+        if self.directory is not None and not os.path.isdir(self.directory):
+            return
+        await super().check_config()
+
+
+# Serve uploaded files; the root is created lazily by get_upload_dir() on first upload
+app.mount(
+    "/uploads",
+    UploadFiles(directory=str(UPLOAD_ROOT), html=False, check_dir=False),
+    name="uploads",
+)
 
 @app.get("/health")
 def health_check() -> dict:
@@ -1,12 +1,16 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class ApplicationCreate(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     jenis_pupuk: str
     jumlah_kg: int
     alasan_pengajuan: str
     lokasi_penggunaan: str
 
 class ProfilPetaniResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     nama_lengkap: str
     nik: str
     alamat: str
@@ -1,15 +1,21 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class LoginRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     username: str
     password: str
 
 class LoginResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     access_token: str
     role: str
     full_name: str | None = None
 
 class RegisterRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     username: str
     password: str
     nama_lengkap: str
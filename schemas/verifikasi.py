@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 
 class VerifikasiPetaniListResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     user_id: int
     nama_lengkap: str
     nik: str
@@ -9,6 +11,8 @@ class VerifikasiPetaniListResponse(BaseModel):
     created_at: str
 
 class VerifikasiPetaniDetailResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     user_id: int
     nama_lengkap: str
     nik: str
@@ -20,10 +24,14 @@ class VerifikasiPetaniDetailResponse(BaseModel):
     created_at: str
 
 class VerifikasiPetaniActionRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     comment: Optional[str] = None
     reason: Optional[str] = None
 
 class VerifikasiHasilTaniListResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     id: int
     petani_id: int
     nama_lengkap: str
@@ -35,6 +43,8 @@ class VerifikasiHasilTaniListResponse(BaseModel):
     created_at: str
 
 class VerifikasiHasilTaniDetailResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     id: int
     petani_id: int
     nama_lengkap: str
@@ -47,5 +57,7 @@ class VerifikasiHasilTaniDetailResponse(BaseModel):
     bukti_url: Optional[str]
 
 class VerifikasiHasilTaniActionRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
     comment: Optional[str] = None
     reason: Optional[str] = None
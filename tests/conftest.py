@@ -0,0 +1,73 @@
+"""
+Shared pytest hooks and helpers for the test suite
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from sqlalchemy import event
+
+# Minimum bcrypt cost for test accounts; must be set before core.config is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from core.security import hash_password as _hash_password
+
+
+@lru_cache(maxsize=None)
+def hash_password(password: str) -> str:
+    """Hash each test password once per run (the salt is stored in the hash)."""
+    return _hash_password(password)
+
+
+def enable_sqlite_savepoints(engine) -> None:
+    """
+    Let SQLAlchemy emit BEGIN itself on a pysqlite engine.
+    pysqlite's own implicit transactions break SAVEPOINT, which the rolled-back
+    per-test transactions rely on.
+    """
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+@contextmanager
+def count_statements(engine, kind: str | None = None):
+    """
+    Collect the SQL statements `engine` runs inside the block.
+    With `kind` (e.g. "SELECT"), only statements of that kind are kept.
+    """
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if kind is None or statement.lstrip().upper().startswith(kind):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def pytest_collection_modifyitems(items):
+    """
+    Run tests marked `slow` after the rest of their module.
+    With --maxfail=1 the cheap tests report failures first; modules stay
+    contiguous so module-scoped fixtures are still set up only once.
+    """
+    module_order = {}
+    for item in items:
+        module_order.setdefault(item.module, len(module_order))
+    items.sort(
+        key=lambda item: (module_order[item.module], item.get_closest_marker("slow") is not None)
+    )
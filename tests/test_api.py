@@ -4,21 +4,19 @@ Tests all endpoints with various scenarios
 """
 
 import pytest
-import os
-import sys
+import time
+from functools import lru_cache
 from io import BytesIO
 from datetime import date, datetime, timedelta
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from jose import jwt
+from sqlalchemy import create_engine, event, insert, select
 from sqlalchemy.pool import StaticPool
 from sqlalchemy.orm import sessionmaker, Session
-from pathlib import Path
-
-ROOT_DIR = Path(__file__).resolve().parents[1]
-if str(ROOT_DIR) not in sys.path:
-    sys.path.insert(0, str(ROOT_DIR))
 
+from conftest import count_statements, enable_sqlite_savepoints, hash_password
 from main import app
+from api.routes.admin import download_laporan_rekap
 from db import db_base
 from db.db_base import get_db
 from db.models import (
@@ -26,7 +24,11 @@ from db.models import (
     ProfileSuperadmin, StokPupuk, PermohonanPupuk, JadwalDistribusi, JadwalDistribusiEvent, HasilTani,
     VerifikasiPenerimaPupuk,
 )
-from core.security import hash_password, create_access_token
+from core import file_utils, security
+from core.config import settings
+from core.dependencies import require_role
+from core.security import create_access_token
+
 
 # ============================================================================
 # CONFIGURATION
@@ -40,18 +42,34 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+enable_sqlite_savepoints(engine)
 
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Create tables
+# Create tables once for the whole module; each test runs in a rolled-back transaction
 Base.metadata.create_all(bind=engine)
 
 
 def override_get_db():
     """Override database dependency for tests"""
-    db = TestingSessionLocal()
+    db = db_base.SessionLocal()
+    uncommitted = {"flushed": False}
+
+    @event.listens_for(db, "after_flush")
+    def _flushed(session, flush_context):
+        uncommitted["flushed"] = True
+
+    @event.listens_for(db, "after_commit")
+    def _committed(session):
+        uncommitted["flushed"] = False
+
     try:
         yield db
+        # Production get_db discards whatever the route did not commit; fail loudly
+        # here rather than keep it
+        if db.new or db.dirty or db.deleted or uncommitted["flushed"]:
+            raise RuntimeError("route left uncommitted changes on its get_db session")
+        # Nothing is pending, so this only releases the session's SAVEPOINT; rolling
+        # it back on close would also undo what get_cursor() committed inside it
+        db.commit()
     finally:
         db.close()
 
@@ -64,41 +82,90 @@ client = TestClient(app)
 # FIXTURES & HELPERS
 # ============================================================================
 
-@pytest.fixture(autouse=True)
-def reset_db():
-    """Reset database before each test"""
-    # Ensure the db_base module uses the in-memory engine/session
+@pytest.fixture(scope="session")
+def connection():
+    """Single connection shared by every test (StaticPool has only one anyway)"""
+    conn = engine.connect()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def client_portal(connection):
+    """
+    Keep the TestClient open for the whole module.
+    Outside a `with` block every request starts its own event loop thread;
+    inside it, all requests share one portal. Lifespan runs once against the test engine.
+    """
     db_base.engine = engine
-    db_base.SessionLocal = TestingSessionLocal
-    db_base._tables_initialized = False
+    with client:
+        yield client
 
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module", autouse=True)
+def upload_root(tmp_path_factory):
+    """Write uploaded files to a pytest temp dir instead of the repo's tmp/uploads"""
+    original = file_utils.UPLOAD_ROOT
+    file_utils.UPLOAD_ROOT = tmp_path_factory.mktemp("uploads")
+    file_utils.get_upload_dir.cache_clear()
+    yield file_utils.UPLOAD_ROOT
+    file_utils.UPLOAD_ROOT = original
+    file_utils.get_upload_dir.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_db(connection):
+    """Run each test inside an outer transaction that is rolled back afterwards"""
+    transaction = connection.begin()
+    # Every session (tests, get_db, get_cursor) joins the outer transaction;
+    # their commits only release a SAVEPOINT
+    session_factory = sessionmaker(
+        autocommit=False, autoflush=False, bind=connection,
+        join_transaction_mode="create_savepoint",
+    )
+    db_base.engine = engine
+    db_base.SessionLocal = session_factory
+    db_base._tables_initialized = True
+    yield session_factory
+    transaction.rollback()
 
 
 @pytest.fixture
-def test_db() -> Session:
+def test_db(reset_db) -> Session:
     """Provide test database session"""
-    db = TestingSessionLocal()
+    db = reset_db()
     yield db
     db.close()
 
 
-@pytest.fixture
-def seed_fertilizers(test_db: Session):
-    """Seed test data with fertilizers"""
+@pytest.fixture(scope="session")
+def today() -> date:
+    """The run's date, read once so every test and request in a run agree on it"""
+    return date.today()
+
+
+@pytest.fixture(scope="module")
+def seed_fertilizers(connection):
+    """
+    Seed test data with fertilizers once per module.
+    Rows are committed before any per-test transaction begins, so every
+    rollback (including stock changes) leaves them as seeded.
+    """
     fertilizers = [
         StokPupuk(nama_pupuk="Urea", jumlah_stok=500, satuan="kg"),
         StokPupuk(nama_pupuk="TSP", jumlah_stok=300, satuan="kg"),
         StokPupuk(nama_pupuk="KCl", jumlah_stok=200, satuan="kg"),
     ]
-    for f in fertilizers:
-        test_db.add(f)
-    test_db.commit()
-    return fertilizers
+    with Session(bind=connection, expire_on_commit=False) as db:
+        db.add_all(fertilizers)
+        db.commit()
+    yield fertilizers
+    with connection.begin():
+        connection.execute(StokPupuk.__table__.delete())
+
 
+# Data fixtures flush instead of commit + refresh: requests share the test's connection,
+# so flushed rows are already visible to them, and nothing is expired and reloaded.
 
 @pytest.fixture
 def create_test_user_petani(test_db: Session) -> User:
@@ -109,8 +176,7 @@ def create_test_user_petani(test_db: Session) -> User:
         role="petani",
     )
     test_db.add(user)
-    test_db.commit()
-    test_db.refresh(user)
+    test_db.flush()
     return user
 
 
@@ -123,8 +189,7 @@ def create_test_user_admin(test_db: Session) -> User:
         role="admin",
     )
     test_db.add(user)
-    test_db.commit()
-    test_db.refresh(user)
+    test_db.flush()
     return user
 
 
@@ -137,42 +202,63 @@ def create_test_user_distributor(test_db: Session) -> User:
         role="distributor",
     )
     test_db.add(user)
-    test_db.commit()
-    test_db.refresh(user)
+    test_db.flush()
     return user
 
 
+@pytest.fixture
+def admin_with_profile(test_db: Session, create_test_user_admin) -> tuple[User, ProfileAdmin]:
+    """Admin user with a ProfileAdmin row"""
+    profile = ProfileAdmin(
+        user_id=create_test_user_admin.id,
+        nama_lengkap="Admin Name",
+        alamat="Jl. Admin",
+        no_hp="081234567893",
+    )
+    test_db.add(profile)
+    test_db.flush()
+    return create_test_user_admin, profile
+
+
+@lru_cache(maxsize=None)
+def token_for(user_id: int) -> str:
+    """
+    Sign one JWT per user id per run.
+    Every test rolls back, so fixture users get the same ids test after test.
+    """
+    return create_access_token(data={"sub": str(user_id)})
+
+
 @pytest.fixture
 def petani_token(create_test_user_petani):
     """Generate JWT token for petani"""
-    return create_access_token(data={"sub": str(create_test_user_petani.id)})
+    return token_for(create_test_user_petani.id)
 
 
 @pytest.fixture
 def admin_token(create_test_user_admin):
     """Generate JWT token for admin"""
-    return create_access_token(data={"sub": str(create_test_user_admin.id)})
+    return token_for(create_test_user_admin.id)
 
 
 @pytest.fixture
 def distributor_token(create_test_user_distributor):
     """Generate JWT token for distributor"""
-    return create_access_token(data={"sub": str(create_test_user_distributor.id)})
+    return token_for(create_test_user_distributor.id)
 
 
 @pytest.fixture
-def superadmin_token():
+def superadmin_token(test_db: Session):
     """Generate JWT token for superadmin"""
-    db = TestingSessionLocal()
+    db = test_db
     user = User(
         username="superadmin",
         password_hash=hash_password("superadminpass"),
             role="super_admin",
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
-    
+    db.flush()  # assigns user.id
+
     # Create profile for superadmin
     profile = ProfileSuperadmin(
         user_id=user.id,
@@ -181,22 +267,65 @@ def superadmin_token():
         no_hp="081234567890",
     )
     db.add(profile)
-    db.commit()
+    db.flush()
     
-    token = create_access_token(data={"sub": str(user.id)})
-    db.close()
-    return token
+    return token_for(user.id)
+
 
+def ktp_upload(
+    filename: str = "test_ktp.pdf",
+    content: bytes = b"KTP content",
+    content_type: str = "application/pdf",
+) -> dict:
+    """Build the foto_ktp multipart payload (a fresh BytesIO, since uploads consume it)."""
+    return {"foto_ktp": (filename, BytesIO(content), content_type)}
 
-def create_test_file():
-    """Create a test file for upload"""
-    file = BytesIO(b"test file content")
-    file.name = "test.pdf"
-    return file
+
+@pytest.fixture
+def petani_headers(petani_token):
+    """Authorization header for the petani test user."""
+    return auth_headers(petani_token)
+
+
+@pytest.fixture
+def admin_headers(admin_token):
+    """Authorization header for the admin test user."""
+    return auth_headers(admin_token)
+
+
+@pytest.fixture
+def distributor_headers(distributor_token):
+    """Authorization header for the distributor test user."""
+    return auth_headers(distributor_token)
+
+
+@pytest.fixture
+def superadmin_headers(superadmin_token):
+    """Authorization header for the superadmin test user."""
+    return auth_headers(superadmin_token)
 
 
 @pytest.fixture
-def seed_jadwal_distribusi(test_db: Session, create_test_user_petani, seed_fertilizers):
+def login_as():
+    """
+    Skip JWT decoding and the user lookup: make require_role(role) resolve
+    straight to the given user for the rest of the test.
+    """
+    overridden = []
+
+    def _login_as(role: str, user: User) -> None:
+        dependency = require_role(role)
+        current = {"id": user.id, "username": user.username, "role": user.role}
+        app.dependency_overrides[dependency] = lambda: current
+        overridden.append(dependency)
+
+    yield _login_as
+    for dependency in overridden:
+        app.dependency_overrides.pop(dependency, None)
+
+
+@pytest.fixture
+def seed_jadwal_distribusi(test_db: Session, create_test_user_petani, seed_fertilizers, today):
     """Seed one permohonan and jadwal distribusi for distributor tests."""
     # Create petani profile
     profile = ProfilePetani(
@@ -208,7 +337,7 @@ def seed_jadwal_distribusi(test_db: Session, create_test_user_petani, seed_ferti
         status_verifikasi=True,
     )
     test_db.add(profile)
-    test_db.commit()
+    test_db.flush()
 
     pupuk = seed_fertilizers[0]
 
@@ -221,22 +350,19 @@ def seed_jadwal_distribusi(test_db: Session, create_test_user_petani, seed_ferti
         alasan="Uji jadwal",
     )
     test_db.add(permohonan)
-    test_db.commit()
-    test_db.refresh(permohonan)
+    test_db.flush()
 
     jadwal = JadwalDistribusiEvent(
         nama_acara="Distribusi Jadwal Test",
-        tanggal=date.today(),
+        tanggal=today,
         lokasi="Gudang Kios Tani Makmur",
         status="dikirim"
     )
     test_db.add(jadwal)
-    test_db.commit()
-    test_db.refresh(jadwal)
+    test_db.flush()
 
     permohonan.jadwal_event_id = jadwal.id
-    test_db.commit()
-    test_db.refresh(permohonan)
+    test_db.flush()
 
     return {
         "profile": profile,
@@ -254,9 +380,7 @@ def seed_jadwal_distribusi_selesai(seed_jadwal_distribusi, test_db: Session):
 
     permohonan.status = "selesai"
     jadwal.status = "selesai"
-    test_db.commit()
-    test_db.refresh(permohonan)
-    test_db.refresh(jadwal)
+    test_db.flush()
 
     seed_jadwal_distribusi["permohonan"] = permohonan
     seed_jadwal_distribusi["jadwal"] = jadwal
@@ -268,6 +392,38 @@ def auth_headers(token: str) -> dict[str, str]:
     return {"Authorization": f"Bearer {token}"}
 
 
+def stock_body(pupuk_id: int, jumlah: int) -> dict:
+    """JSON body for tambah/kurangi_stock_pupuk (stock is seeded in kg)."""
+    return {"pupuk_id": pupuk_id, "jumlah": jumlah, "satuan": "kg"}
+
+
+# Shared fields for POST /superadmin/users/add; tests override what they check
+CREATE_USER_BASE = {
+    "password": "securepass123",
+    "role": "admin",
+    "alamat": "Jl. Test",
+    "no_hp": "081234567899",
+}
+
+
+def post_create_user(headers: dict[str, str], **fields):
+    """POST /superadmin/users/add with CREATE_USER_BASE plus overrides."""
+    return client.post(
+        "/superadmin/users/add",
+        json={**CREATE_USER_BASE, **fields},
+        headers=headers,
+    )
+
+
+INVALID_TOKEN = "invalid.token.here"
+# Signed once at import; it expired an hour before the suite started
+EXPIRED_TOKEN = jwt.encode(
+    {"sub": "1", "exp": datetime.utcnow() - timedelta(hours=1)},
+    settings.SECRET_KEY,
+    algorithm=settings.ALGORITHM,
+)
+
+
 # ============================================================================
 # HEALTH CHECK TESTS
 # ============================================================================
@@ -281,6 +437,24 @@ class TestHealth:
         assert response.status_code == 200
         assert response.json() == {"status": "ok"}
 
+    def test_uploads_missing_file(self):
+        """Test a missing upload is a 404 (the uploads root exists from startup)"""
+        response = client.get("/uploads/missing.jpg")
+        assert response.status_code == 404
+
+    def test_cors_preflight_cached(self):
+        """Test CORS preflight is answered with a long max-age"""
+        response = client.options(
+            "/petani/pupuk",
+            headers={
+                "Origin": "http://localhost:5173",
+                "Access-Control-Request-Method": "GET",
+            },
+        )
+        assert response.status_code == 200
+        assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+        assert response.headers["access-control-max-age"] == "86400"
+
 
 # ============================================================================
 # AUTHENTICATION TESTS
@@ -298,9 +472,7 @@ class TestAuth:
             "no_hp": "081234567890",
             "password": "TestPassword123!",
         }
-        files = {
-            "foto_ktp": ("test_ktp.pdf", BytesIO(b"KTP content"), "application/pdf"),
-        }
+        files = ktp_upload()
         
         response = client.post("/auth/register_petani", data=data, files=files)
         assert response.status_code == 200
@@ -320,9 +492,7 @@ class TestAuth:
             "no_hp": "081234567890",
             "password": "TestPassword123!",
         }
-        files = {
-            "foto_ktp": ("test_ktp.pdf", BytesIO(b"KTP content"), "application/pdf"),
-        }
+        files = ktp_upload()
         
         response = client.post("/auth/register_petani", data=data, files=files)
         assert response.status_code == 400
@@ -337,9 +507,7 @@ class TestAuth:
             "no_hp": "089876543210",
             "password": "TestPassword456!",
         }
-        files = {
-            "foto_ktp": ("test_ktp.pdf", BytesIO(b"KTP content"), "application/pdf"),
-        }
+        files = ktp_upload()
         
         response = client.post("/auth/register_petani", data=data, files=files)
         assert response.status_code == 409
@@ -353,9 +521,7 @@ class TestAuth:
             "no_hp": "081234567890",
             "password": "",
         }
-        files = {
-            "foto_ktp": ("test_ktp.pdf", BytesIO(b"KTP content"), "application/pdf"),
-        }
+        files = ktp_upload()
         
         response = client.post("/auth/register_petani", data=data, files=files)
         assert response.status_code == 422  # Validation error from FastAPI
@@ -397,11 +563,11 @@ class TestAuth:
         )
         assert response.status_code == 401
 
-    def test_logout(self, petani_token):
+    def test_logout(self, petani_headers):
         """Test logout endpoint"""
         response = client.post(
             "/auth/logout",
-            headers={"Authorization": f"Bearer {petani_token}"}
+            headers=petani_headers
         )
         assert response.status_code == 200
         assert response.json()["message"] == "Logged out successfully"
@@ -419,7 +585,7 @@ class TestAuth:
 class TestPetaniEndpoints:
     """Test petani-specific endpoints"""
 
-    def test_get_profile_success(self, create_test_user_petani, test_db: Session, petani_token):
+    def test_get_profile_success(self, create_test_user_petani, test_db: Session, petani_headers):
         """Test getting petani profile"""
         # Create profile for the user
         profile = ProfilePetani(
@@ -435,32 +601,27 @@ class TestPetaniEndpoints:
 
         response = client.get(
             "/petani/profile",
-            headers={"Authorization": f"Bearer {petani_token}"}
+            headers=petani_headers
         )
         assert response.status_code == 200
         data = response.json()
         assert data["nama_lengkap"] == "Test Petani"
         assert data["nik"] == "1234567890123456"
 
-    def test_get_profile_not_found(self, petani_token):
+    def test_get_profile_not_found(self, petani_headers):
         """Test getting profile when not created"""
         response = client.get(
             "/petani/profile",
-            headers={"Authorization": f"Bearer {petani_token}"}
+            headers=petani_headers
         )
         assert response.status_code == 404
         assert "Profil tidak ditemukan" in response.json()["detail"]
 
-    def test_get_profile_unauthorized(self):
-        """Test getting profile without token"""
-        response = client.get("/petani/profile")
-        assert response.status_code == 401
-
-    def test_list_pupuk(self, seed_fertilizers, petani_token):
+    def test_list_pupuk(self, seed_fertilizers, petani_headers):
         """Test getting list of fertilizers"""
         response = client.get(
             "/petani/pupuk",
-            headers={"Authorization": f"Bearer {petani_token}"}
+            headers=petani_headers
         )
         assert response.status_code == 200
         data = response.json()
@@ -471,22 +632,17 @@ class TestPetaniEndpoints:
         assert "Urea" in returned
         assert returned & seeded  # at least one seeded fertilizer present
 
-    def test_list_pupuk_empty(self, petani_token):
+    def test_list_pupuk_empty(self, petani_headers):
         """Test getting list of fertilizers - checks response structure"""
         response = client.get(
             "/petani/pupuk",
-            headers={"Authorization": f"Bearer {petani_token}"}
+            headers=petani_headers
         )
         assert response.status_code == 200
         # Just verify it's a list, not empty since dev db may have data
         data = response.json()
         assert isinstance(data, list)
 
-    def test_list_pupuk_unauthorized(self):
-        """Test getting pupuk list without token"""
-        response = client.get("/petani/pupuk")
-        assert response.status_code == 401
-
 
 # ============================================================================
 # ADMIN ENDPOINTS TESTS
@@ -495,16 +651,16 @@ class TestPetaniEndpoints:
 class TestAdminEndpoints:
     """Test admin-specific endpoints"""
 
-    def test_list_persetujuan_pupuk_empty(self, admin_token):
+    def test_list_persetujuan_pupuk_empty(self, admin_headers):
         """Test listing fertilizer approvals when empty"""
         response = client.get(
             "/admin/persetujuan_pupuk",
-            headers={"Authorization": f"Bearer {admin_token}"}
+            headers=admin_headers
         )
         assert response.status_code == 200
         assert response.json() == []
 
-    def test_list_verifikasi_hasil_tani(self, admin_token, test_db: Session, create_test_user_petani):
+    def test_list_verifikasi_hasil_tani(self, admin_headers, test_db: Session, create_test_user_petani, today):
         """Test listing hasil tani verification"""
         # Create profile for petani
         profile = ProfilePetani(
@@ -529,17 +685,20 @@ class TestAdminEndpoints:
             jenis_tanaman="Padi",
             jumlah_hasil=1000,
             satuan="kg",
-            tanggal_panen=date.today(),
+            tanggal_panen=today,
             status_verifikasi=False
         )
         test_db.add(hasil)
         test_db.commit()
 
-        response = client.get(
-            "/admin/verifikasi_hasil_tani",
-            headers={"Authorization": f"Bearer {admin_token}"}
-        )
+        with count_statements(engine, "SELECT") as selects:
+            response = client.get(
+                "/admin/verifikasi_hasil_tani",
+                headers=admin_headers
+            )
         assert response.status_code == 200
+        # Petani names come from the JOIN, not one query per row
+        assert len(selects) <= 2
         data = response.json()
         assert len(data) >= 1
         found = False
@@ -558,48 +717,46 @@ class TestAdminEndpoints:
 class TestAdminStockAndReports:
     """Tests for stock adjustments, history, and laporan rekap endpoints."""
 
-    def test_tambah_stock_pupuk_success(self, seed_fertilizers, admin_token):
+    def test_tambah_stock_pupuk_success(self, test_db, seed_fertilizers, admin_headers):
         pupuk_id = seed_fertilizers[0].id
         response = client.post(
             "/admin/tambah_stock_pupuk",
-            headers={"Authorization": f"Bearer {admin_token}"},
-            json={"pupuk_id": pupuk_id, "jumlah": 100, "satuan": "kg"},
+            headers=admin_headers,
+            json=stock_body(pupuk_id, 100),
         )
         assert response.status_code == 200
 
-        db = TestingSessionLocal()
-        stok = db.query(StokPupuk).get(pupuk_id)
+        # Seeded in another session, so this loads the row the request just updated
+        stok = test_db.get(StokPupuk, pupuk_id)
         assert stok.jumlah_stok == 600  # 500 + 100
-        db.close()
 
-    def test_kurangi_stock_pupuk_over_limit(self, seed_fertilizers, admin_token):
+    def test_kurangi_stock_pupuk_over_limit(self, seed_fertilizers, admin_headers):
         pupuk_id = seed_fertilizers[0].id
         response = client.post(
             "/admin/kurangi_stock_pupuk",
-            headers={"Authorization": f"Bearer {admin_token}"},
-            json={"pupuk_id": pupuk_id, "jumlah": 9999, "satuan": "kg"},
+            headers=admin_headers,
+            json=stock_body(pupuk_id, 9999),
         )
         assert response.status_code == 400
         assert "melebihi" in response.json()["detail"]
 
-    def test_riwayat_stock_filters(self, seed_fertilizers, admin_token):
+    def test_riwayat_stock_filters(self, seed_fertilizers, admin_headers, today):
         pupuk_id = seed_fertilizers[0].id
         # Add and subtract to create two history rows
         client.post(
             "/admin/tambah_stock_pupuk",
-            headers={"Authorization": f"Bearer {admin_token}"},
-            json={"pupuk_id": pupuk_id, "jumlah": 50, "satuan": "kg"},
+            headers=admin_headers,
+            json=stock_body(pupuk_id, 50),
         )
         client.post(
             "/admin/kurangi_stock_pupuk",
-            headers={"Authorization": f"Bearer {admin_token}"},
-            json={"pupuk_id": pupuk_id, "jumlah": 20, "satuan": "kg"},
+            headers=admin_headers,
+            json=stock_body(pupuk_id, 20),
         )
 
-        today = date.today().isoformat()
         response = client.get(
             f"/admin/riwayat_stock_pupuk?pupuk_id={pupuk_id}&tipe=kurangi&created_from={today}&created_to={today}",
-            headers={"Authorization": f"Bearer {admin_token}"},
+            headers=admin_headers,
         )
         assert response.status_code == 200
         data = response.json()
@@ -607,86 +764,76 @@ class TestAdminStockAndReports:
         assert data[0]["tipe"] == "kurangi"
         assert data[0]["jumlah"] == 20
 
-    def test_laporan_rekap_harian_and_csv(self, seed_fertilizers, admin_token):
+    @pytest.mark.slow
+    def test_laporan_rekap_harian_and_csv(self, seed_fertilizers, create_test_user_admin, admin_headers, today):
         pupuk_id = seed_fertilizers[0].id
         # Create some distribution (kurangi)
         client.post(
             "/admin/kurangi_stock_pupuk",
-            headers={"Authorization": f"Bearer {admin_token}"},
-            json={"pupuk_id": pupuk_id, "jumlah": 40, "satuan": "kg"},
+            headers=admin_headers,
+            json=stock_body(pupuk_id, 40),
         )
 
-        today = date.today().isoformat()
         # JSON recap
         resp = client.get(
             f"/admin/laporan_rekap_harian?tanggal={today}",
-            headers={"Authorization": f"Bearer {admin_token}"},
+            headers=admin_headers,
         )
         assert resp.status_code == 200
         body = resp.json()
         assert body["total_penyaluran_kg"] >= 40
         assert isinstance(body["rekapitulasi"], list)
 
-        # CSV download
-        csv_resp = client.get(
-            f"/admin/download_laporan_rekap?tipe=harian&tanggal={today}",
-            headers={"Authorization": f"Bearer {admin_token}"},
+        # CSV download: routing and auth are covered above, so call the handler directly
+        csv_resp = download_laporan_rekap(
+            tipe="harian", tanggal=today, user=create_test_user_admin
         )
         assert csv_resp.status_code == 200
-        assert "text/csv" in csv_resp.headers.get("content-type", "")
-        assert "Urea" in csv_resp.text
+        assert csv_resp.media_type == "text/csv"
+        assert "Urea" in csv_resp.body.decode()
 
-    def test_list_verifikasi_petani_empty(self, admin_token):
+    def test_list_verifikasi_petani_empty(self, admin_headers):
         """Test listing petani verification when empty"""
         response = client.get(
             "/admin/verifikasi_petani",
-            headers={"Authorization": f"Bearer {admin_token}"}
+            headers=admin_headers
         )
         assert response.status_code == 200
         assert response.json() == []
 
-    def test_verifikasi_petani_unauthorized(self):
-        """Test verifikasi endpoints without token"""
-        response = client.get("/admin/verifikasi_petani")
-        assert response.status_code == 401
-
-    def test_verifikasi_petani_forbidden_role(self, petani_token):
-        """Test verifikasi endpoints with wrong role"""
-        response = client.get(
-            "/admin/verifikasi_petani",
-            headers={"Authorization": f"Bearer {petani_token}"}
-        )
-        assert response.status_code == 403
-
-    def test_list_verifikasi_petani_with_pagination(self, admin_token, test_db: Session):
+    @pytest.mark.slow
+    def test_list_verifikasi_petani_with_pagination(self, login_as, create_test_user_admin, test_db: Session):
         """Test verifikasi petani with pagination"""
-        # Create test petani profiles
-        for i in range(5):
-            user = User(
-                username=f"petani_{i}",
-                password_hash=hash_password("test"),
-                role="petani",
-            )
-            test_db.add(user)
-            test_db.commit()
-            test_db.refresh(user)
-            
-            profile = ProfilePetani(
-                user_id=user.id,
-                nama_lengkap=f"Petani {i}",
-                nik=f"{1000000000000000 + i}",
-                alamat=f"Jl. Test {i}",
-                no_hp=f"0812345678{i:02d}",
-            )
-            test_db.add(profile)
-            test_db.commit()
-
-        response = client.get(
-            "/admin/verifikasi_petani?page=1&page_size=2",
-            headers={"Authorization": f"Bearer {admin_token}"}
+        # Create test petani profiles: one INSERT .. RETURNING for the user ids, one for profiles
+        user_ids = test_db.scalars(
+            insert(User).returning(User.id),
+            [
+                {"username": f"petani_{i}", "password_hash": hash_password("test"), "role": "petani"}
+                for i in range(5)
+            ],
+        ).all()
+        test_db.execute(
+            insert(ProfilePetani),
+            [
+                {
+                    "user_id": user_id,
+                    "nama_lengkap": f"Petani {i}",
+                    "nik": f"{1000000000000000 + i}",
+                    "alamat": f"Jl. Test {i}",
+                    "no_hp": f"0812345678{i:02d}",
+                }
+                for i, user_id in enumerate(user_ids)
+            ],
         )
+        test_db.commit()
+
+        login_as("admin", create_test_user_admin)
+        with count_statements(engine, "SELECT") as selects:
+            response = client.get("/admin/verifikasi_petani?page=1&page_size=2")
         assert response.status_code == 200
         assert len(response.json()) <= 2
+        # Auth is overridden, so only the paged query runs, regardless of row count
+        assert len(selects) == 1
 
 
 # ============================================================================
@@ -696,32 +843,19 @@ class TestAdminStockAndReports:
 class TestDistributorEndpoints:
     """Test distributor-specific endpoints"""
 
-    def test_list_jadwal_distribusi(self, distributor_token, seed_jadwal_distribusi):
-        response = client.get(
-            "/distributor/jadwal-distribusi-pupuk",
-            headers=auth_headers(distributor_token),
-        )
+    def test_list_jadwal_distribusi(self, login_as, create_test_user_distributor, seed_jadwal_distribusi):
+        login_as("distributor", create_test_user_distributor)
+        response = client.get("/distributor/jadwal-distribusi-pupuk")
         assert response.status_code == 200
         data = response.json()
         assert len(data) >= 1
         assert data[0]["lokasi"] == "Gudang Kios Tani Makmur"
 
-    def test_list_jadwal_distribusi_unauthorized(self):
-        response = client.get("/distributor/jadwal-distribusi-pupuk")
-        assert response.status_code == 401
-
-    def test_list_jadwal_distribusi_forbidden(self, petani_token):
-        response = client.get(
-            "/distributor/jadwal-distribusi-pupuk",
-            headers=auth_headers(petani_token),
-        )
-        assert response.status_code == 403
-
-    def test_jadwal_detail(self, distributor_token, seed_jadwal_distribusi):
+    def test_jadwal_detail(self, distributor_headers, seed_jadwal_distribusi):
         jadwal_id = seed_jadwal_distribusi["jadwal"].id
         response = client.get(
             f"/distributor/jadwal-distribusi-pupuk/{jadwal_id}",
-            headers=auth_headers(distributor_token),
+            headers=distributor_headers,
         )
         assert response.status_code == 200
         data = response.json()
@@ -730,18 +864,18 @@ class TestDistributorEndpoints:
         assert len(data["penerima_list"]) == 1
         assert data["penerima_list"][0]["nama_petani"] == "Petani Jadwal"
 
-    def test_jadwal_detail_not_found(self, distributor_token):
+    def test_jadwal_detail_not_found(self, distributor_headers):
         response = client.get(
             "/distributor/jadwal-distribusi-pupuk/9999",
-            headers=auth_headers(distributor_token),
+            headers=distributor_headers,
         )
         assert response.status_code == 404
 
-    def test_verifikasi_penerima_pupuk(self, distributor_token, seed_jadwal_distribusi, test_db: Session):
+    def test_verifikasi_penerima_pupuk(self, distributor_headers, seed_jadwal_distribusi, test_db: Session):
         permohonan_id = seed_jadwal_distribusi["permohonan"].id
         response = client.post(
             "/distributor/verifikasi-penerima-pupuk",
-            headers=auth_headers(distributor_token),
+            headers=distributor_headers,
             data={
                 "permohonan_id": permohonan_id,
                 "catatan": "Bukti diterima",
@@ -752,17 +886,16 @@ class TestDistributorEndpoints:
         assert data["permohonan_id"] == permohonan_id
         assert data["status_baru"] == "selesai"
 
-        # Refresh session to see changes made by other sessions
-        test_db.expire_all()
-        
-        # Ensure DB updated
-        updated_permohonan = test_db.get(PermohonanPupuk, permohonan_id)
-        assert updated_permohonan.status == "selesai"
+        # Ensure DB updated; a column query reads the row without expiring the session
+        status = test_db.scalar(
+            select(PermohonanPupuk.status).where(PermohonanPupuk.id == permohonan_id)
+        )
+        assert status == "selesai"
 
-    def test_riwayat_distribusi(self, distributor_token, seed_jadwal_distribusi_selesai):
+    def test_riwayat_distribusi(self, distributor_headers, seed_jadwal_distribusi_selesai):
         response = client.get(
             "/distributor/riwayat-distribusi-pupuk",
-            headers=auth_headers(distributor_token),
+            headers=distributor_headers,
         )
         assert response.status_code == 200
         data = response.json()
@@ -777,29 +910,54 @@ class TestDistributorEndpoints:
 class TestSuperadminEndpoints:
     """Test superadmin-specific endpoints"""
 
-    def test_get_metrics(self, superadmin_token):
+    def test_get_metrics(self, superadmin_headers):
         """Test getting system metrics"""
         response = client.get(
             "/superadmin/metrics",
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         data = response.json()
         assert "uptime" in data
         assert "total_users" in data
 
-    def test_get_metrics_unauthorized(self):
-        """Test getting metrics without token"""
-        response = client.get("/superadmin/metrics")
-        assert response.status_code == 401
 
-    def test_get_metrics_forbidden_role(self, petani_token):
-        """Test getting metrics with wrong role"""
-        response = client.get(
-            "/superadmin/metrics",
-            headers={"Authorization": f"Bearer {petani_token}"}
-        )
-        assert response.status_code == 403
+# ============================================================================
+# ACCESS CONTROL TESTS
+# ============================================================================
+
+@pytest.fixture
+def headers(request):
+    """Resolve a *_headers fixture by name; None means no Authorization header."""
+    return request.getfixturevalue(request.param) if request.param else {}
+
+
+class TestAccessControl:
+    """Missing tokens get 401, wrong roles get 403"""
+
+    @pytest.mark.parametrize(
+        "path, headers, expected",
+        [
+            ("/petani/profile", None, 401),
+            ("/petani/pupuk", None, 401),
+            ("/admin/verifikasi_petani", None, 401),
+            ("/admin/verifikasi_petani", "petani_headers", 403),
+            ("/distributor/jadwal-distribusi-pupuk", None, 401),
+            ("/distributor/jadwal-distribusi-pupuk", "petani_headers", 403),
+            ("/superadmin/metrics", None, 401),
+            ("/superadmin/metrics", "petani_headers", 403),
+            ("/superadmin/metrics", "admin_headers", 403),
+        ],
+        indirect=["headers"],
+    )
+    def test_auth_matrix(self, path, headers, expected):
+        response = client.get(path, headers=headers)
+        assert response.status_code == expected
+
+    def test_require_role_shared_checker(self):
+        """Test require_role returns one checker however optional is spelled"""
+        assert require_role("admin") is require_role("admin", optional=False)
+        assert require_role("admin") is not require_role("admin", optional=True)
 
 
 # ============================================================================
@@ -813,33 +971,28 @@ class TestSecurityAndValidation:
         """Test endpoint with invalid token"""
         response = client.get(
             "/petani/profile",
-            headers={"Authorization": "Bearer invalid.token.here"}
+            headers=auth_headers(INVALID_TOKEN)
         )
         assert response.status_code == 401
 
-    def test_expired_token(self, test_db: Session):
+    def test_expired_token(self):
         """Test with expired token (simulated)"""
-        # Create a token that's already expired
-        from datetime import datetime, timedelta
-        from jose import jwt
-        from core.config import settings
-
-        expired_payload = {
-            "sub": "1",
-            "exp": datetime.utcnow() - timedelta(hours=1)  # Expired 1 hour ago
-        }
-        expired_token = jwt.encode(
-            expired_payload,
-            settings.SECRET_KEY,
-            algorithm=settings.ALGORITHM
-        )
-
         response = client.get(
             "/petani/profile",
-            headers={"Authorization": f"Bearer {expired_token}"}
+            headers=auth_headers(EXPIRED_TOKEN)
         )
         assert response.status_code == 401
 
+    def test_cached_token_expires(self, petani_headers, monkeypatch):
+        """Test a token decoded (and cached) earlier is rejected once it expires"""
+        response = client.get("/petani/profile", headers=petani_headers)
+        assert response.status_code != 401
+
+        later = time.time() + (settings.ACCESS_TOKEN_EXPIRE_MINUTES + 1) * 60
+        monkeypatch.setattr(security, "_now", lambda: later)
+        response = client.get("/petani/profile", headers=petani_headers)
+        assert response.status_code == 401
+
     def test_missing_authorization_header(self):
         """Test endpoint without authorization header"""
         response = client.get("/petani/profile")
@@ -854,9 +1007,7 @@ class TestSecurityAndValidation:
             "no_hp": "081234567890",
             "password": "Test123!",
         }
-        files = {
-            "foto_ktp": ("test.pdf", BytesIO(b"content"), "application/pdf"),
-        }
+        files = ktp_upload()
         
         response = client.post("/auth/register_petani", data=data, files=files)
         assert response.status_code == 400
@@ -878,9 +1029,7 @@ class TestFileUpload:
             "no_hp": "081234567890",
             "password": "Test123!",
         }
-        files = {
-            "foto_ktp": ("ktp.pdf", BytesIO(b"PDF content here"), "application/pdf"),
-        }
+        files = ktp_upload()
 
         response = client.post("/auth/register_petani", data=data, files=files)
         assert response.status_code == 200
@@ -895,9 +1044,7 @@ class TestFileUpload:
             "no_hp": "081234567890",
             "password": "Test123!",
         }
-        files = {
-            "foto_ktp": ("virus.exe", BytesIO(b"executable"), "application/x-msdownload"),
-        }
+        files = ktp_upload("virus.exe", b"executable", "application/x-msdownload")
 
         response = client.post("/auth/register_petani", data=data, files=files)
         assert response.status_code == 400
@@ -910,6 +1057,7 @@ class TestFileUpload:
 class TestIntegration:
     """Integration tests combining multiple endpoints"""
 
+    @pytest.mark.slow
     def test_complete_registration_and_login_flow(self, seed_fertilizers):
         """Test complete flow: register → login"""
         # Step 1: Register
@@ -920,9 +1068,7 @@ class TestIntegration:
             "no_hp": "081234567890",
             "password": "FlowTest123!",
         }
-        reg_files = {
-            "foto_ktp": ("test.pdf", BytesIO(b"content"), "application/pdf"),
-        }
+        reg_files = ktp_upload()
 
         reg_response = client.post("/auth/register_petani", data=reg_data, files=reg_files)
         assert reg_response.status_code == 200
@@ -952,35 +1098,35 @@ class TestIntegration:
         self,
         create_test_user_petani,
         create_test_user_admin,
-        petani_token,
-        admin_token,
+        petani_headers,
+        admin_headers,
     ):
         """Test that different roles can only access their endpoints"""
         # Petani can access /petani/pupuk
         petani_response = client.get(
             "/petani/pupuk",
-            headers={"Authorization": f"Bearer {petani_token}"}
+            headers=petani_headers
         )
         assert petani_response.status_code in [200, 404]
 
         # Admin cannot access /petani/pupuk
         admin_on_petani = client.get(
             "/petani/pupuk",
-            headers={"Authorization": f"Bearer {admin_token}"}
+            headers=admin_headers
         )
         assert admin_on_petani.status_code == 403
 
         # Admin can access admin endpoints
         admin_response = client.get(
             "/admin/verifikasi_petani",
-            headers={"Authorization": f"Bearer {admin_token}"}
+            headers=admin_headers
         )
         assert admin_response.status_code in [200, 404]
 
         # Petani cannot access /admin/verifikasi_petani
         petani_on_admin = client.get(
             "/admin/verifikasi_petani",
-            headers={"Authorization": f"Bearer {petani_token}"}
+            headers=petani_headers
         )
         assert petani_on_admin.status_code == 403
 
@@ -1001,9 +1147,7 @@ class TestEdgeCases:
             "no_hp": "081234567890",
             "password": "Test123!",
         }
-        files = {
-            "foto_ktp": ("test.pdf", BytesIO(b"content"), "application/pdf"),
-        }
+        files = ktp_upload()
 
         response = client.post("/auth/register_petani", data=data, files=files)
         # Should either accept or reject with proper error
@@ -1018,9 +1162,7 @@ class TestEdgeCases:
             "no_hp": "081234567890",
             "password": "Test123!",
         }
-        files = {
-            "foto_ktp": ("test.pdf", BytesIO(b"content"), "application/pdf"),
-        }
+        files = ktp_upload()
 
         response = client.post("/auth/register_petani", data=data, files=files)
         # Should handle safely
@@ -1035,9 +1177,7 @@ class TestEdgeCases:
             "no_hp": "081234567890",
             "password": "Test123!",
         }
-        files = {
-            "foto_ktp": ("test.pdf", BytesIO(b"content"), "application/pdf"),
-        }
+        files = ktp_upload()
 
         response = client.post("/auth/register_petani", data=data, files=files)
         # Should accept (names can be numeric)
@@ -1051,11 +1191,11 @@ class TestEdgeCases:
 class TestSuperadmin:
     """Test superadmin endpoints"""
 
-    def test_metrics(self, superadmin_token):
+    def test_metrics(self, superadmin_headers):
         """Test getting metrics as superadmin"""
         response = client.get(
             "/superadmin/metrics",
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         data = response.json()
@@ -1063,15 +1203,7 @@ class TestSuperadmin:
         assert "total_users" in data
         assert "error_logs" in data
 
-    def test_metrics_unauthorized(self, admin_token):
-        """Test metrics endpoint requires superadmin role"""
-        response = client.get(
-            "/superadmin/metrics",
-            headers={"Authorization": f"Bearer {admin_token}"}
-        )
-        assert response.status_code == 403
-
-    def test_list_users(self, test_db: Session, superadmin_token, create_test_user_petani, create_test_user_admin):
+    def test_list_users(self, test_db: Session, superadmin_headers, create_test_user_petani, create_test_user_admin):
         """Test listing all users"""
         # Create profiles for test users
         petani_profile = ProfilePetani(
@@ -1094,14 +1226,14 @@ class TestSuperadmin:
 
         response = client.get(
             "/superadmin/users",
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         data = response.json()
         assert isinstance(data, list)
         assert len(data) >= 2  # At least petani and admin users
 
-    def test_list_users_with_role_filter(self, test_db: Session, superadmin_token, create_test_user_petani):
+    def test_list_users_with_role_filter(self, test_db: Session, superadmin_headers, create_test_user_petani):
         """Test listing users with role filter"""
         # Create profile
         profile = ProfilePetani(
@@ -1117,7 +1249,7 @@ class TestSuperadmin:
 
         response = client.get(
             "/superadmin/users?role=petani",
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         data = response.json()
@@ -1126,62 +1258,65 @@ class TestSuperadmin:
         for user in data:
             assert user["role"] == "petani"
 
-    def test_list_users_with_pagination(self, test_db: Session, superadmin_token):
+    def test_list_users_with_pagination(self, test_db: Session, superadmin_headers):
         """Test listing users with pagination"""
         response = client.get(
             "/superadmin/users?page=1&page_size=10",
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         data = response.json()
         assert isinstance(data, list)
         assert len(data) <= 10  # Should not exceed page_size
 
-    def test_get_user_detail(self, test_db: Session, superadmin_token, create_test_user_admin):
-        """Test getting user detail"""
-        # Create profile
-        profile = ProfileAdmin(
-            user_id=create_test_user_admin.id,
-            nama_lengkap="Test Admin Detail",
-            alamat="Jl. Admin Detail",
-            no_hp="081234567892",
+    def test_list_users_with_cursor(self, superadmin_headers, admin_with_profile):
+        """Test keyset pagination via cursor and X-Next-Cursor"""
+        response = client.get("/superadmin/users?page_size=1", headers=superadmin_headers)
+        assert response.status_code == 200
+        first = response.json()
+        assert len(first) == 1
+        next_cursor = response.headers["X-Next-Cursor"]
+        assert next_cursor == str(first[0]["user_id"])
+
+        response = client.get(
+            f"/superadmin/users?cursor={next_cursor}&page_size=100",
+            headers=superadmin_headers
         )
-        test_db.add(profile)
-        test_db.commit()
+        assert response.status_code == 200
+        rest = response.json()
+        assert rest
+        assert all(u["user_id"] < first[0]["user_id"] for u in rest)
+        assert "X-Next-Cursor" not in response.headers  # Last page
+
+    def test_get_user_detail(self, superadmin_headers, admin_with_profile):
+        """Test getting user detail"""
+        user, profile = admin_with_profile
 
         response = client.get(
-            f"/superadmin/users/{create_test_user_admin.id}",
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            f"/superadmin/users/{user.id}",
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         data = response.json()
-        assert data["user_id"] == create_test_user_admin.id
-        assert data["username"] == create_test_user_admin.username
+        assert data["user_id"] == user.id
+        assert data["username"] == user.username
         assert data["role"] == "admin"
-        assert data["nama_lengkap"] == "Test Admin Detail"
+        assert data["nama_lengkap"] == profile.nama_lengkap
 
-    def test_get_user_detail_not_found(self, superadmin_token):
+    def test_get_user_detail_not_found(self, superadmin_headers):
         """Test getting non-existent user detail"""
         response = client.get(
             "/superadmin/users/99999",
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 404
 
-    def test_create_admin_user(self, superadmin_token):
+    def test_create_admin_user(self, superadmin_headers):
         """Test creating a new admin user"""
-        data = {
-            "username": "new_admin",
-            "password": "securepass123",
-            "role": "admin",
-            "nama_lengkap": "New Admin User",
-            "alamat": "Jl. New Admin",
-            "no_hp": "081234567899",
-        }
-        response = client.post(
-            "/superadmin/users/add",
-            json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+        response = post_create_user(
+            superadmin_headers,
+            username="new_admin",
+            nama_lengkap="New Admin User",
         )
         assert response.status_code == 200
         result = response.json()
@@ -1190,21 +1325,14 @@ class TestSuperadmin:
         assert result["role"] == "admin"
         assert "user_id" in result
 
-    def test_create_distributor_user(self, superadmin_token):
+    def test_create_distributor_user(self, superadmin_headers):
         """Test creating a new distributor user"""
-        data = {
-            "username": "new_distributor",
-            "password": "securepass123",
-            "role": "distributor",
-            "nama_lengkap": "New Distributor User",
-            "alamat": "Jl. New Distributor",
-            "no_hp": "081234567898",
-            "perusahaan": "PT. Test Distributor",
-        }
-        response = client.post(
-            "/superadmin/users/add",
-            json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+        response = post_create_user(
+            superadmin_headers,
+            username="new_distributor",
+            role="distributor",
+            nama_lengkap="New Distributor User",
+            perusahaan="PT. Test Distributor",
         )
         assert response.status_code == 200
         result = response.json()
@@ -1212,63 +1340,42 @@ class TestSuperadmin:
         assert result["username"] == "new_distributor"
         assert result["role"] == "distributor"
 
-    def test_create_distributor_without_perusahaan(self, superadmin_token):
+    def test_create_distributor_without_perusahaan(self, superadmin_headers):
         """Test creating distributor without perusahaan should fail"""
-        data = {
-            "username": "bad_distributor",
-            "password": "securepass123",
-            "role": "distributor",
-            "nama_lengkap": "Bad Distributor",
-            "alamat": "Jl. Bad",
-            "no_hp": "081234567897",
-        }
-        response = client.post(
-            "/superadmin/users/add",
-            json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+        response = post_create_user(
+            superadmin_headers,
+            username="bad_distributor",
+            role="distributor",
+            nama_lengkap="Bad Distributor",
         )
         assert response.status_code == 400
         assert "Perusahaan wajib diisi" in response.json()["detail"]
 
-    def test_create_superadmin_user(self, superadmin_token):
+    def test_create_superadmin_user(self, superadmin_headers):
         """Test creating a new superadmin user"""
-        data = {
-            "username": "new_superadmin",
-            "password": "securepass123",
-            "role": "super_admin",
-            "nama_lengkap": "New Super Admin",
-            "alamat": "Jl. New Super",
-            "no_hp": "081234567896",
-        }
-        response = client.post(
-            "/superadmin/users/add",
-            json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+        response = post_create_user(
+            superadmin_headers,
+            username="new_superadmin",
+            role="super_admin",
+            nama_lengkap="New Super Admin",
         )
         assert response.status_code == 200
         result = response.json()
         assert result["status"] == "success"
         assert result["role"] == "super_admin"
 
-    def test_create_user_with_invalid_role(self, superadmin_token):
+    def test_create_user_with_invalid_role(self, superadmin_headers):
         """Test creating user with invalid role"""
-        data = {
-            "username": "invalid_role",
-            "password": "securepass123",
-            "role": "invalid_role_type",
-            "nama_lengkap": "Invalid Role User",
-            "alamat": "Jl. Invalid",
-            "no_hp": "081234567895",
-        }
-        response = client.post(
-            "/superadmin/users/add",
-            json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+        response = post_create_user(
+            superadmin_headers,
+            username="invalid_role",
+            role="invalid_role_type",
+            nama_lengkap="Invalid Role User",
         )
         assert response.status_code == 400
         assert "Role harus" in response.json()["detail"]
 
-    def test_create_user_with_duplicate_username(self, test_db: Session, superadmin_token):
+    def test_create_user_with_duplicate_username(self, test_db: Session, superadmin_headers):
         """Test creating user with existing username"""
         # Create first user
         user = User(
@@ -1280,58 +1387,34 @@ class TestSuperadmin:
         test_db.commit()
 
         # Try to create another user with same username
-        data = {
-            "username": "duplicate_user",
-            "password": "securepass123",
-            "role": "admin",
-            "nama_lengkap": "Duplicate User",
-            "alamat": "Jl. Duplicate",
-            "no_hp": "081234567894",
-        }
-        response = client.post(
-            "/superadmin/users/add",
-            json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+        response = post_create_user(
+            superadmin_headers,
+            username="duplicate_user",
+            nama_lengkap="Duplicate User",
         )
         assert response.status_code == 409
         assert "Username sudah terdaftar" in response.json()["detail"]
 
-    def test_edit_user_name(self, test_db: Session, superadmin_token, create_test_user_admin):
+    def test_edit_user_name(self, superadmin_headers, admin_with_profile):
         """Test editing user name"""
-        # Create profile
-        profile = ProfileAdmin(
-            user_id=create_test_user_admin.id,
-            nama_lengkap="Old Name",
-            alamat="Jl. Old",
-            no_hp="081234567893",
-        )
-        test_db.add(profile)
-        test_db.commit()
+        user, _ = admin_with_profile
 
         data = {
             "nama_lengkap": "New Name Updated",
         }
         response = client.put(
-            f"/superadmin/users/{create_test_user_admin.id}",
+            f"/superadmin/users/{user.id}",
             json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         result = response.json()
         assert result["status"] == "success"
         assert result["updated_fields"]["nama_lengkap"] == "New Name Updated"
 
-    def test_edit_user_multiple_fields(self, test_db: Session, superadmin_token, create_test_user_admin):
+    def test_edit_user_multiple_fields(self, superadmin_headers, admin_with_profile):
         """Test editing multiple user fields"""
-        # Create profile
-        profile = ProfileAdmin(
-            user_id=create_test_user_admin.id,
-            nama_lengkap="Old Name",
-            alamat="Jl. Old",
-            no_hp="081234567893",
-        )
-        test_db.add(profile)
-        test_db.commit()
+        user, _ = admin_with_profile
 
         data = {
             "nama_lengkap": "New Name",
@@ -1339,9 +1422,9 @@ class TestSuperadmin:
             "no_hp": "089876543210",
         }
         response = client.put(
-            f"/superadmin/users/{create_test_user_admin.id}",
+            f"/superadmin/users/{user.id}",
             json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         result = response.json()
@@ -1350,25 +1433,17 @@ class TestSuperadmin:
         assert result["updated_fields"]["alamat"] == "Jl. New Address"
         assert result["updated_fields"]["no_hp"] == "089876543210"
 
-    def test_edit_user_password(self, test_db: Session, superadmin_token, create_test_user_admin):
+    def test_edit_user_password(self, superadmin_headers, admin_with_profile):
         """Test editing user password"""
-        # Create profile
-        profile = ProfileAdmin(
-            user_id=create_test_user_admin.id,
-            nama_lengkap="Admin Name",
-            alamat="Jl. Admin",
-            no_hp="081234567893",
-        )
-        test_db.add(profile)
-        test_db.commit()
+        user, _ = admin_with_profile
 
         data = {
             "password": "newpassword123",
         }
         response = client.put(
-            f"/superadmin/users/{create_test_user_admin.id}",
+            f"/superadmin/users/{user.id}",
             json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         result = response.json()
@@ -1376,7 +1451,7 @@ class TestSuperadmin:
         assert "password" in result["updated_fields"]
         assert result["updated_fields"]["password"] == "***"
 
-    def test_edit_distributor_perusahaan(self, test_db: Session, superadmin_token, create_test_user_distributor):
+    def test_edit_distributor_perusahaan(self, test_db: Session, superadmin_headers, create_test_user_distributor):
         """Test editing distributor's perusahaan"""
         # Create profile
         profile = ProfileDistributor(
@@ -1396,14 +1471,14 @@ class TestSuperadmin:
         response = client.put(
             f"/superadmin/users/{create_test_user_distributor.id}",
             json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         result = response.json()
         assert result["status"] == "success"
         assert result["updated_fields"]["perusahaan"] == "New Company Ltd"
 
-    def test_edit_user_not_found(self, superadmin_token):
+    def test_edit_user_not_found(self, superadmin_headers):
         """Test editing non-existent user"""
         data = {
             "nama_lengkap": "New Name",
@@ -1411,72 +1486,46 @@ class TestSuperadmin:
         response = client.put(
             "/superadmin/users/99999",
             json=data,
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 404
 
-    def test_delete_user(self, test_db: Session, superadmin_token):
+    def test_delete_user(self, test_db: Session, superadmin_headers, admin_with_profile):
         """Test deleting a user"""
-        # Create a user to delete
-        user = User(
-            username="user_to_delete",
-            password_hash=hash_password("password123"),
-            role="admin",
-        )
-        test_db.add(user)
-        test_db.commit()
-        test_db.refresh(user)
+        user, _ = admin_with_profile
         user_id = user.id
 
-        # Create profile
-        profile = ProfileAdmin(
-            user_id=user_id,
-            nama_lengkap="User To Delete",
-            alamat="Jl. Delete",
-            no_hp="081234567892",
-        )
-        test_db.add(profile)
-        test_db.commit()
-
         response = client.delete(
             f"/superadmin/users/{user_id}",
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 200
         result = response.json()
         assert result["status"] == "success"
-        assert result["username"] == "user_to_delete"
+        assert result["username"] == "admin_user"
 
-        # Verify user is deleted by querying with a fresh session
-        deleted_user = test_db.query(User).filter(User.id == user_id).first()
-        assert deleted_user is None
+        # Drop the cached instance so get() has to ask the database
+        test_db.expire_all()
+        assert test_db.get(User, user_id) is None
 
-    def test_delete_user_not_found(self, superadmin_token):
+    def test_delete_user_not_found(self, superadmin_headers):
         """Test deleting non-existent user"""
         response = client.delete(
             "/superadmin/users/99999",
-            headers={"Authorization": f"Bearer {superadmin_token}"}
+            headers=superadmin_headers
         )
         assert response.status_code == 404
 
-    def test_create_user_unauthorized(self, admin_token):
+    def test_create_user_unauthorized(self, admin_headers):
         """Test creating user requires superadmin role"""
-        data = {
-            "username": "unauthorized_user",
-            "password": "securepass123",
-            "role": "admin",
-            "nama_lengkap": "Unauthorized User",
-            "alamat": "Jl. Unauthorized",
-            "no_hp": "081234567891",
-        }
-        response = client.post(
-            "/superadmin/users/add",
-            json=data,
-            headers={"Authorization": f"Bearer {admin_token}"}
+        response = post_create_user(
+            admin_headers,
+            username="unauthorized_user",
+            nama_lengkap="Unauthorized User",
         )
         assert response.status_code == 403
 
-    def test_edit_user_unauthorized(self, admin_token):
+    def test_edit_user_unauthorized(self, admin_headers):
         """Test editing user requires superadmin role"""
         data = {
             "nama_lengkap": "New Name",
@@ -1484,15 +1533,15 @@ class TestSuperadmin:
         response = client.put(
             "/superadmin/users/1",
             json=data,
-            headers={"Authorization": f"Bearer {admin_token}"}
+            headers=admin_headers
         )
         assert response.status_code == 403
 
-    def test_delete_user_unauthorized(self, admin_token):
+    def test_delete_user_unauthorized(self, admin_headers):
         """Test deleting user requires superadmin role"""
         response = client.delete(
             "/superadmin/users/1",
-            headers={"Authorization": f"Bearer {admin_token}"}
+            headers=admin_headers
         )
         assert response.status_code == 403
 
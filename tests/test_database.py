@@ -4,24 +4,24 @@ Tests all entities, relationships, and database operations
 """
 
 import pytest
-import sys
 from datetime import datetime, date, timedelta
-from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, insert, select, text, update
 from sqlalchemy.pool import StaticPool
-from sqlalchemy.orm import sessionmaker, Session
-
-ROOT_DIR = Path(__file__).resolve().parents[1]
-if str(ROOT_DIR) not in sys.path:
-    sys.path.insert(0, str(ROOT_DIR))
+from sqlalchemy.orm import Session, joinedload, selectinload
 
+from conftest import count_statements, enable_sqlite_savepoints, hash_password
 from db.models import (
     Base, User, ProfilePetani, ProfileDistributor, ProfileAdmin, 
     ProfileSuperadmin, StokPupuk, PermohonanPupuk, JadwalDistribusi, 
     HasilTani, JadwalDistribusiEvent, JadwalDistribusiItem, 
     RiwayatStockPupuk, VerifikasiPenerimaPupuk
 )
-from core.security import hash_password
+
+
+# Fixed dates keep row payloads identical from run to run (nothing here depends on the clock)
+TODAY = date(2025, 1, 15)
+NOW = datetime(2025, 1, 15, 12, 0, 0)
+
 
 # ============================================================================
 # DATABASE SETUP
@@ -34,23 +34,39 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+enable_sqlite_savepoints(engine)
+
+# Schema is built once; each test's writes are rolled back instead of dropping tables
+Base.metadata.create_all(bind=engine)
 
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="session")
+def connection():
+    """The single StaticPool connection, shared by every test"""
+    conn = engine.connect()
+    yield conn
+    conn.close()
 
 
 @pytest.fixture(autouse=True)
-def reset_db():
-    """Reset database before each test"""
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+def reset_db(connection):
+    """Wrap each test in a transaction that is rolled back afterwards"""
+    transaction = connection.begin()
     yield
-    Base.metadata.drop_all(bind=engine)
+    transaction.rollback()
 
 
 @pytest.fixture
-def db() -> Session:
-    """Provide test database session"""
-    session = TestingSessionLocal()
+def db(connection) -> Session:
+    """
+    Provide test database session; its commits only release a SAVEPOINT.
+    Nothing is expired on commit: ids and server defaults come back with the
+    INSERT, so tests only refresh() when they mean to re-read the database.
+    """
+    session = Session(
+        bind=connection, autoflush=False, expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
     yield session
     session.close()
 
@@ -58,22 +74,38 @@ def db() -> Session:
 # ============================================================================
 # HELPER FIXTURES - CREATE TEST DATA
 # ============================================================================
+# Fixtures flush instead of commit + refresh: the flush assigns ids, nothing is
+# expired (so no reload SELECT per object), and the test's rollback discards the rows.
+
+def insert_rows(db: Session, model, rows: list[dict]) -> list:
+    """
+    INSERT rows in one multi-row statement and return them as ORM objects.
+    A plain flush inserts these models one row at a time (they RETURN server
+    defaults). RETURNING order is not guaranteed without sort_by_parameter_order,
+    which SQLite only honours one row at a time; instead we rely on SQLite giving
+    a multi-row VALUES insert ascending ids in parameter order, and check it.
+    """
+    objs = sorted(
+        db.scalars(insert(model).returning(model), rows).all(),
+        key=lambda obj: obj.id,
+    )
+    for obj, row in zip(objs, rows, strict=True):
+        assert all(getattr(obj, key) == value for key, value in row.items()), (
+            f"{model.__name__} ids do not follow insert order: {row}"
+        )
+    return objs
+
 
 @pytest.fixture
 def users(db: Session):
     """Create test users with different roles"""
-    users_list = [
-        User(username="petani001", password_hash=hash_password("pass123"), role="petani"),
-        User(username="petani002", password_hash=hash_password("pass123"), role="petani"),
-        User(username="distributor001", password_hash=hash_password("pass123"), role="distributor"),
-        User(username="admin001", password_hash=hash_password("pass123"), role="admin"),
-        User(username="superadmin001", password_hash=hash_password("pass123"), role="super_admin"),
-    ]
-    db.add_all(users_list)
-    db.commit()
-    for user in users_list:
-        db.refresh(user)
-    return users_list
+    return insert_rows(db, User, [
+        dict(username="petani001", password_hash=hash_password("pass123"), role="petani"),
+        dict(username="petani002", password_hash=hash_password("pass123"), role="petani"),
+        dict(username="distributor001", password_hash=hash_password("pass123"), role="distributor"),
+        dict(username="admin001", password_hash=hash_password("pass123"), role="admin"),
+        dict(username="superadmin001", password_hash=hash_password("pass123"), role="super_admin"),
+    ])
 
 
 @pytest.fixture
@@ -98,9 +130,7 @@ def petani_profiles(db: Session, users):
         ),
     ]
     db.add_all(profiles)
-    db.commit()
-    for profile in profiles:
-        db.refresh(profile)
+    db.flush()
     return profiles
 
 
@@ -116,8 +146,7 @@ def distributor_profiles(db: Session, users):
         status_verifikasi=True
     )
     db.add(profile)
-    db.commit()
-    db.refresh(profile)
+    db.flush()
     return profile
 
 
@@ -131,8 +160,7 @@ def admin_profile(db: Session, users):
         no_hp="083234567890"
     )
     db.add(profile)
-    db.commit()
-    db.refresh(profile)
+    db.flush()
     return profile
 
 
@@ -146,55 +174,44 @@ def superadmin_profile(db: Session, users):
         no_hp="083234567899"
     )
     db.add(profile)
-    db.commit()
-    db.refresh(profile)
+    db.flush()
     return profile
 
 
 @pytest.fixture
 def fertilizers(db: Session):
     """Create fertilizer items"""
-    ferts = [
-        StokPupuk(nama_pupuk="Urea", jumlah_stok=5000, satuan="kg"),
-        StokPupuk(nama_pupuk="TSP", jumlah_stok=3000, satuan="kg"),
-        StokPupuk(nama_pupuk="KCl", jumlah_stok=2500, satuan="kg"),
-        StokPupuk(nama_pupuk="NPK 16:16:16", jumlah_stok=4000, satuan="kg"),
-    ]
-    db.add_all(ferts)
-    db.commit()
-    for fert in ferts:
-        db.refresh(fert)
-    return ferts
+    return insert_rows(db, StokPupuk, [
+        dict(nama_pupuk="Urea", jumlah_stok=5000, satuan="kg"),
+        dict(nama_pupuk="TSP", jumlah_stok=3000, satuan="kg"),
+        dict(nama_pupuk="KCl", jumlah_stok=2500, satuan="kg"),
+        dict(nama_pupuk="NPK 16:16:16", jumlah_stok=4000, satuan="kg"),
+    ])
 
 
 @pytest.fixture
 def permohonan_list(db: Session, petani_profiles, fertilizers):
     """Create fertilizer requests"""
-    requests = [
-        PermohonanPupuk(
+    return insert_rows(db, PermohonanPupuk, [
+        dict(
             petani_id=petani_profiles[0].user_id,
             pupuk_id=fertilizers[0].id,
             jumlah_diminta=300,
             jumlah_disetujui=280,
             status="terverifikasi",
             alasan="Kebutuhan musim tanam",
-            created_at=datetime.now()
+            created_at=NOW
         ),
-        PermohonanPupuk(
+        dict(
             petani_id=petani_profiles[1].user_id,
             pupuk_id=fertilizers[1].id,
             jumlah_diminta=200,
             jumlah_disetujui=None,
             status="pending",
             alasan="Pemupukan lanjutan",
-            created_at=datetime.now()
+            created_at=NOW
         ),
-    ]
-    db.add_all(requests)
-    db.commit()
-    for req in requests:
-        db.refresh(req)
-    return requests
+    ])
 
 
 # ============================================================================
@@ -213,7 +230,6 @@ class TestUserEntity:
         )
         db.add(user)
         db.commit()
-        db.refresh(user)
         
         assert user.id is not None
         assert user.username == "testuser"
@@ -259,7 +275,6 @@ class TestPetaniProfile:
         )
         db.add(profile)
         db.commit()
-        db.refresh(profile)
         
         assert profile.user_id == users[0].id
         assert profile.nama_lengkap == "Budi Santoso"
@@ -299,12 +314,20 @@ class TestPetaniProfile:
     
     def test_petani_permohonan_relationship(self, db: Session, permohonan_list, petani_profiles):
         """Test petani-permohonan relationship"""
-        petani = db.query(ProfilePetani).filter_by(
-            user_id=petani_profiles[0].user_id
-        ).first()
-        
-        assert len(petani.permohonan_pupuk) > 0
-        assert petani.permohonan_pupuk[0].pupuk_id == 1
+        db.expunge_all()
+        with count_statements(engine) as statements:
+            petani = db.get(
+                ProfilePetani, petani_profiles[0].user_id,
+                options=[
+                    selectinload(ProfilePetani.permohonan_pupuk).joinedload(PermohonanPupuk.pupuk)
+                ],
+            )
+            
+            assert len(petani.permohonan_pupuk) > 0
+            assert petani.permohonan_pupuk[0].pupuk_id == 1
+            assert all(p.pupuk is not None for p in petani.permohonan_pupuk)
+        # Petani, then one IN query for the collection (pupuk is joined into it)
+        assert len(statements) == 2
 
 
 # ============================================================================
@@ -323,7 +346,6 @@ class TestFertilizer:
         )
         db.add(fert)
         db.commit()
-        db.refresh(fert)
         
         assert fert.id is not None
         assert fert.nama_pupuk == "Urea"
@@ -377,7 +399,6 @@ class TestPermohonanPupuk:
         )
         db.add(req)
         db.commit()
-        db.refresh(req)
         
         assert req.id is not None
         assert req.jumlah_diminta == 500
@@ -399,19 +420,12 @@ class TestPermohonanPupuk:
             status="pending"
         )
         db.add(req)
-        db.commit()
-        
-        # Simulate status changes
-        req.status = "terverifikasi"
-        db.commit()
-        
-        req.status = "dijadwalkan"
-        db.commit()
-        
-        req.status = "dikirim"
-        db.commit()
+        db.flush()
         
-        req.status = "selesai"
+        # Simulate status changes; each flush writes the step, one commit at the end
+        for status in ("terverifikasi", "dijadwalkan", "dikirim", "selesai"):
+            req.status = status
+            db.flush()
         db.commit()
         db.refresh(req)
         
@@ -425,6 +439,18 @@ class TestPermohonanPupuk:
         assert req.pupuk is not None
         assert req.petani.nama_lengkap == "Budi Santoso"
 
+    def test_permohonan_relationships_joined_load(self, db: Session, permohonan_list):
+        """Test joinedload brings petani and pupuk back with the permohonan in one SELECT"""
+        db.expunge_all()
+        with count_statements(engine) as statements:
+            req = db.get(
+                PermohonanPupuk, permohonan_list[0].id,
+                options=[joinedload(PermohonanPupuk.petani), joinedload(PermohonanPupuk.pupuk)],
+            )
+            assert req.petani.nama_lengkap == "Budi Santoso"
+            assert req.pupuk.nama_pupuk == "Urea"
+        assert len(statements) == 1
+
 
 # ============================================================================
 # TESTS: JADWAL DISTRIBUSI
@@ -437,29 +463,30 @@ class TestJadwalDistribusi:
         """Test creating a distribution schedule"""
         jadwal = JadwalDistribusi(
             permohonan_id=permohonan_list[0].id,
-            tanggal_pengiriman=date.today() + timedelta(days=5),
+            tanggal_pengiriman=TODAY + timedelta(days=5),
             lokasi="Gudang Desa",
             status="dijadwalkan"
         )
         db.add(jadwal)
         db.commit()
-        db.refresh(jadwal)
         
         assert jadwal.id is not None
         assert jadwal.status == "dijadwalkan"
     
-    def test_jadwal_status_values(self, db: Session):
-        """Test that jadwal has valid status values"""
-        valid_statuses = ["dijadwalkan", "dikirim", "selesai"]
-        
+    @pytest.mark.parametrize("status", ["dijadwalkan", "dikirim", "selesai"])
+    def test_jadwal_status_values(self, db: Session, permohonan_list, status):
+        """Test that each valid jadwal status passes the CHECK constraint"""
         jadwal = JadwalDistribusi(
-            permohonan_id=1,
-            tanggal_pengiriman=date.today(),
+            permohonan_id=permohonan_list[0].id,
+            tanggal_pengiriman=TODAY,
             lokasi="Test",
-            status="dijadwalkan"
+            status=status
         )
+        db.add(jadwal)
+        db.flush()
         
-        assert jadwal.status in valid_statuses
+        assert jadwal.id is not None
+        assert jadwal.status == status
     
     def test_jadwal_date_tracking(self, db: Session, permohonan_list):
         """Test that dates are properly tracked"""
@@ -490,12 +517,11 @@ class TestHasilTani:
             jenis_tanaman="Padi",
             jumlah_hasil=5000,
             satuan="kg",
-            tanggal_panen=date.today(),
-            created_at=datetime.now()
+            tanggal_panen=TODAY,
+            created_at=NOW
         )
         db.add(hasil)
         db.commit()
-        db.refresh(hasil)
         
         assert hasil.id is not None
         assert hasil.jenis_tanaman == "Padi"
@@ -503,31 +529,26 @@ class TestHasilTani:
     
     def test_harvest_multiple_crops(self, db: Session, petani_profiles):
         """Test recording multiple harvest types per petani"""
-        crops = [
-            HasilTani(
+        insert_rows(db, HasilTani, [
+            dict(
                 petani_id=petani_profiles[0].user_id,
                 jenis_tanaman="Padi",
                 jumlah_hasil=5000,
                 satuan="kg",
-                tanggal_panen=date.today()
+                tanggal_panen=TODAY
             ),
-            HasilTani(
+            dict(
                 petani_id=petani_profiles[0].user_id,
                 jenis_tanaman="Jagung",
                 jumlah_hasil=3000,
                 satuan="kg",
-                tanggal_panen=date.today()
+                tanggal_panen=TODAY
             ),
-        ]
-        db.add_all(crops)
+        ])
         db.commit()
         
-        petani = db.query(ProfilePetani).filter_by(
-            user_id=petani_profiles[0].user_id
-        ).first()
-        
         # Note: HasilTani doesn't have back_populates, so we query directly
-        harvests = db.query(HasilTani).filter_by(petani_id=petani.user_id).all()
+        harvests = db.query(HasilTani).filter_by(petani_id=petani_profiles[0].user_id).all()
         assert len(harvests) == 2
 
 
@@ -538,39 +559,28 @@ class TestHasilTani:
 class TestRiwayatStockPupuk:
     """Test RiwayatStockPupuk model"""
     
-    def test_stock_history_tambah(self, db: Session, fertilizers, users):
-        """Test recording stock increase"""
-        riwayat = RiwayatStockPupuk(
-            pupuk_id=fertilizers[0].id,
-            tipe="tambah",
-            jumlah=1000,
-            satuan="kg",
-            catatan="Stock dari gudang pusat",
-            admin_user_id=users[3].id
-        )
-        db.add(riwayat)
-        db.commit()
-        db.refresh(riwayat)
-        
-        assert riwayat.tipe == "tambah"
-        assert riwayat.jumlah == 1000
-    
-    def test_stock_history_kurangi(self, db: Session, fertilizers, users):
-        """Test recording stock decrease"""
+    @pytest.mark.parametrize(
+        "tipe, jumlah, catatan",
+        [
+            ("tambah", 1000, "Stock dari gudang pusat"),
+            ("kurangi", 500, "Penyerahan untuk permohonan"),
+        ],
+    )
+    def test_stock_history_tipe(self, db: Session, fertilizers, users, tipe, jumlah, catatan):
+        """Test recording stock increase and decrease"""
         riwayat = RiwayatStockPupuk(
             pupuk_id=fertilizers[0].id,
-            tipe="kurangi",
-            jumlah=500,
+            tipe=tipe,
+            jumlah=jumlah,
             satuan="kg",
-            catatan="Penyerahan untuk permohonan",
+            catatan=catatan,
             admin_user_id=users[3].id
         )
         db.add(riwayat)
         db.commit()
-        db.refresh(riwayat)
         
-        assert riwayat.tipe == "kurangi"
-        assert riwayat.jumlah == 500
+        assert riwayat.tipe == tipe
+        assert riwayat.jumlah == jumlah
     
     def test_stock_history_timeline(self, db: Session, fertilizers, users):
         """Test stock history timeline"""
@@ -583,7 +593,7 @@ class TestRiwayatStockPupuk:
             admin_user_id=users[3].id
         )
         db.add(initial)
-        db.commit()
+        db.flush()
         
         # Decrease
         decrease = RiwayatStockPupuk(
@@ -604,6 +614,17 @@ class TestRiwayatStockPupuk:
         assert history[0].tipe == "tambah"
         assert history[1].tipe == "kurangi"
 
+    def test_stock_history_timeline_uses_index(self, db: Session, fertilizers):
+        """Test the per-pupuk timeline is read from (pupuk_id, created_at) without a sort"""
+        query = db.query(RiwayatStockPupuk).filter_by(
+            pupuk_id=fertilizers[0].id
+        ).order_by(RiwayatStockPupuk.created_at)
+        sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+        plan = " ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+        assert "ix_riwayat_stock_pupuk_pupuk_id_created_at" in plan
+        assert "TEMP B-TREE" not in plan
+
 
 # ============================================================================
 # TESTS: JADWAL DISTRIBUSI EVENT
@@ -616,12 +637,11 @@ class TestJadwalDistribusiEvent:
         """Test creating an event"""
         event = JadwalDistribusiEvent(
             nama_acara="Pembagian Pupuk Musim Tanam",
-            tanggal=date.today() + timedelta(days=10),
+            tanggal=TODAY + timedelta(days=10),
             lokasi="Lapangan Desa"
         )
         db.add(event)
         db.commit()
-        db.refresh(event)
         
         assert event.id is not None
         assert event.nama_acara == "Pembagian Pupuk Musim Tanam"
@@ -630,31 +650,33 @@ class TestJadwalDistribusiEvent:
         """Test event with multiple items"""
         event = JadwalDistribusiEvent(
             nama_acara="Pembagian Pupuk",
-            tanggal=date.today() + timedelta(days=10),
+            tanggal=TODAY + timedelta(days=10),
             lokasi="Lapangan Desa"
         )
         db.add(event)
         db.flush()
         
-        items = [
-            JadwalDistribusiItem(
+        insert_rows(db, JadwalDistribusiItem, [
+            dict(
                 event_id=event.id,
                 pupuk_id=fertilizers[0].id,
                 jumlah=1000,
                 satuan="kg"
             ),
-            JadwalDistribusiItem(
+            dict(
                 event_id=event.id,
                 pupuk_id=fertilizers[1].id,
                 jumlah=500,
                 satuan="kg"
             ),
-        ]
-        db.add_all(items)
-        db.commit()
+        ])
         
-        db.refresh(event)
-        assert len(event.items) == 2
+        item_count = db.scalar(
+            select(func.count())
+            .select_from(JadwalDistribusiItem)
+            .where(JadwalDistribusiItem.event_id == event.id)
+        )
+        assert item_count == 2
 
 
 # ============================================================================
@@ -674,7 +696,6 @@ class TestVerifikasiPenerimaPupuk:
         )
         db.add(verif)
         db.commit()
-        db.refresh(verif)
         
         assert verif.id is not None
         assert verif.catatan == "Pupuk diterima dengan baik"
@@ -690,9 +711,12 @@ class TestVerifikasiPenerimaPupuk:
         db.add(verif)
         db.commit()
         
-        # Verify relationships work
-        assert verif.permohonan is not None
-        assert verif.distributor is not None
+        # Verify relationships work; both targets are already in the session,
+        # so the many-to-one loads resolve from the identity map
+        with count_statements(engine) as statements:
+            assert verif.permohonan is permohonan_list[0]
+            assert verif.distributor is users[2]
+        assert statements == []
 
 
 # ============================================================================
@@ -713,29 +737,27 @@ class TestDatabaseIntegration:
             status="pending"
         )
         db.add(req)
-        db.commit()
-        db.refresh(req)
+        db.flush()
         
         # 2. Verify request
         req.status = "terverifikasi"
-        db.commit()
+        db.flush()
         
         # 3. Schedule delivery
         req.status = "dijadwalkan"
         jadwal = JadwalDistribusi(
             permohonan_id=req.id,
-            tanggal_pengiriman=date.today() + timedelta(days=5),
+            tanggal_pengiriman=TODAY + timedelta(days=5),
             lokasi="Gudang Desa",
             status="dijadwalkan"
         )
         db.add(jadwal)
-        db.commit()
-        db.refresh(jadwal)
+        db.flush()
         
         # 4. Record delivery
         req.status = "dikirim"
         jadwal.status = "dikirim"
-        db.commit()
+        db.flush()
         
         # 5. Verify receipt
         verif = VerifikasiPenerimaPupuk(
@@ -749,7 +771,7 @@ class TestDatabaseIntegration:
         jadwal.status = "selesai"
         db.commit()
         
-        # Verify complete workflow
+        # Verify complete workflow (intermediate steps were flushed; one commit above)
         db.refresh(req)
         assert req.status == "selesai"
         assert jadwal.status == "selesai"
@@ -769,25 +791,29 @@ class TestDatabaseIntegration:
         )
         db.add(history)
         
-        # Update stock
-        fertilizers[0].jumlah_stok += 500
+        # Update stock in place, as tambah_stock_pupuk does (no read-modify-write)
+        fert_id = fertilizers[0].id
+        db.execute(
+            update(StokPupuk)
+            .where(StokPupuk.id == fert_id)
+            .values(jumlah_stok=StokPupuk.jumlah_stok + 500)
+        )
         db.commit()
         
-        db.refresh(fertilizers[0])
-        assert fertilizers[0].jumlah_stok == initial_stock + 500
+        jumlah_stok = db.scalar(select(StokPupuk.jumlah_stok).where(StokPupuk.id == fert_id))
+        assert jumlah_stok == initial_stock + 500
     
     def test_data_count_verification(self, db: Session, users, petani_profiles, fertilizers, permohonan_list):
         """Verify all seeded data is properly stored"""
-        user_count = db.query(User).count()
-        petani_count = db.query(ProfilePetani).count()
-        fert_count = db.query(StokPupuk).count()
-        req_count = db.query(PermohonanPupuk).count()
-        
-        assert user_count > 0
-        assert petani_count > 0
-        assert fert_count > 0
-        assert req_count > 0
-
-
-if __name__ == "__main__":
-    pytest.main([__file__, "-v", "--tb=short"])
+        # One SELECT of four EXISTS probes; each stops at the first row instead of counting
+        has_users, has_petani, has_ferts, has_reqs = db.query(
+            db.query(User).exists(),
+            db.query(ProfilePetani).exists(),
+            db.query(StokPupuk).exists(),
+            db.query(PermohonanPupuk).exists(),
+        ).one()
+        
+        assert has_users
+        assert has_petani
+        assert has_ferts
+        assert has_reqs
@@ -0,0 +1,68 @@
+"""
+Tests for the connection pool helpers in db.db_base
+"""
+
+from db import db_base
+
+
+class _FakeConnection:
+    def __init__(self, fail: bool):
+        self.fail = fail
+        self.closed = False
+
+    def execute(self, statement):
+        if self.fail:
+            raise RuntimeError("probe failed")
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeEngine:
+    """Stands in for a non-SQLite engine; records every connection handed out."""
+
+    class dialect:
+        name = "postgresql"
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.connections = []
+
+    def connect(self):
+        conn = _FakeConnection(self.fail)
+        self.connections.append(conn)
+        return conn
+
+
+class TestWarmConnectionPool:
+    """Test db_base.warm_connection_pool against a stubbed engine"""
+
+    def test_warm_pool_size_zero(self, monkeypatch):
+        """Test a pool size of 0 warms nothing instead of failing startup"""
+        fake = _FakeEngine()
+        monkeypatch.setattr(db_base, "engine", fake)
+
+        assert db_base.warm_connection_pool(size=0) == 0
+        assert fake.connections == []
+
+    def test_warm_pool_closes_connections(self, monkeypatch):
+        """Test every warmed connection is returned to the pool"""
+        fake = _FakeEngine()
+        monkeypatch.setattr(db_base, "engine", fake)
+
+        assert db_base.warm_connection_pool(size=3) == 3
+        assert len(fake.connections) == 3
+        assert all(conn.closed for conn in fake.connections)
+
+    def test_warm_pool_failing_probe(self, monkeypatch):
+        """Test a connection whose SELECT 1 fails is closed, not leaked"""
+        fake = _FakeEngine(fail=True)
+        monkeypatch.setattr(db_base, "engine", fake)
+
+        assert db_base.warm_connection_pool(size=2) == 0
+        assert len(fake.connections) == 2
+        assert all(conn.closed for conn in fake.connections)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])